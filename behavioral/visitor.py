@@ -56,6 +56,15 @@ class Number(Node):
         self.value = value
 
 
+class Variable(Node):
+    """
+    An input of the expression: its value is supplied at evaluation time by name.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+
 class NodeVisitor(object):
     """
     To use this class, a programmer inherits from it and implements various methods of the form visit_Name(),
@@ -83,6 +92,13 @@ class Evaluator(NodeVisitor):
     We can have any number of different Evaluator classes which implement different logic.
     """
 
+    def __init__(self, variables=None):
+        # values of the Variable nodes by their names
+        self.variables = variables or {}
+
+    def visit_Variable(self, node):
+        return self.variables[node.name]
+
     def visit_Number(self, node):
         return float(node.value)
 
@@ -99,7 +115,7 @@ class Evaluator(NodeVisitor):
         return self.visit(node.left) / self.visit(node.right)
 
     def visit_Negate(self, node):
-        return -node.operand
+        return -self.visit(node.operand)
 
 
 # Representation of 1 + 2 * (3 - 4) / 5
@@ -109,4 +125,7 @@ t3 = Div(t2, Number(5))
 t4 = Add(Number(1), t3)
 
 e = Evaluator()
-assert e.visit(t4) == 0.6
\ No newline at end of file
+assert e.visit(t4) == 0.6
+
+# Representation of -x * 2
+assert Evaluator({'x': 3}).visit(Mul(Negate(Variable('x')), Number(2))) == -6
\ No newline at end of file
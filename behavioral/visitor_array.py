@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""
+Every node object carries its own __dict__, so a tree of millions of nodes takes a lot of memory and is slow to load.
+A tree can be stored in a much more compact way as a "structure of arrays": the node with index i is described by
+opcodes[i], left[i], right[i] and values[i].
+The nodes are stored in post-order, so the children of a node always precede it and the root is the last node:
+such a tree is evaluated by a single loop over the arrays without any recursion.
+
+The arrays are written to a file as is, so a saved tree can be memory-mapped and evaluated
+without creating a single node object.
+"""
+from array import array
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import timeit
+
+from behavioral.visitor import Evaluator, Add, Sub, Mul, Div, Negate, Number, Variable
+
+NUMBER, VARIABLE, ADD, SUB, MUL, DIV, NEGATE = range(7)
+
+# opcodes by node classes
+OPCODES = {Number: NUMBER, Variable: VARIABLE, Add: ADD, Sub: SUB, Mul: MUL, Div: DIV, Negate: NEGATE}
+# node classes by opcodes
+NODE_CLASSES = dict((opcode, cls) for cls, opcode in OPCODES.items())
+
+# magic, format version, number of nodes, size of the encoded variable names
+HEADER = struct.Struct('<4sIII')
+MAGIC = b'EXPR'
+VERSION = 1
+
+
+class ArrayTree(object):
+    """
+    A tree stored in four parallel arrays.
+    A Number keeps its value in "values", a Variable keeps there an index of its name in "names".
+    Unused child indexes are -1.
+    """
+
+    __slots__ = ('opcodes', 'left', 'right', 'values', 'names', '_mmap')
+
+    def __init__(self, opcodes=None, left=None, right=None, values=None, names=None):
+        self.opcodes = array('B') if opcodes is None else opcodes
+        self.left = array('i') if left is None else left
+        self.right = array('i') if right is None else right
+        self.values = array('d') if values is None else values
+        self.names = [] if names is None else names
+        self._mmap = None
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    @classmethod
+    def from_node(cls, root):
+        """
+        Converts a tree of node objects. A node shared by several parents (a DAG) is stored once.
+        """
+        tree = cls()
+        indexes = {}
+        name_indexes = {}
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if id(node) in indexes:
+                continue
+            opcode = OPCODES[type(node)]
+            if opcode == NUMBER:
+                tree._append(node, indexes, opcode, -1, -1, float(node.value))
+            elif opcode == VARIABLE:
+                if node.name not in name_indexes:
+                    name_indexes[node.name] = len(tree.names)
+                    tree.names.append(node.name)
+                tree._append(node, indexes, opcode, -1, -1, name_indexes[node.name])
+            elif not children_done:
+                stack.append((node, True))
+                if opcode == NEGATE:
+                    stack.append((node.operand, False))
+                else:
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+            elif opcode == NEGATE:
+                tree._append(node, indexes, opcode, indexes[id(node.operand)], -1, 0)
+            else:
+                tree._append(node, indexes, opcode, indexes[id(node.left)], indexes[id(node.right)], 0)
+        return tree
+
+    def _append(self, node, indexes, opcode, left, right, value):
+        indexes[id(node)] = len(self.opcodes)
+        self.opcodes.append(opcode)
+        self.left.append(left)
+        self.right.append(right)
+        self.values.append(value)
+
+    def to_node(self):
+        """
+        Converts the arrays back to a tree of node objects.
+        """
+        nodes = []
+        for i in range(len(self.opcodes)):
+            opcode = self.opcodes[i]
+            if opcode == NUMBER:
+                nodes.append(Number(self.values[i]))
+            elif opcode == VARIABLE:
+                nodes.append(Variable(self.names[int(self.values[i])]))
+            elif opcode == NEGATE:
+                nodes.append(Negate(nodes[self.left[i]]))
+            else:
+                nodes.append(NODE_CLASSES[opcode](nodes[self.left[i]], nodes[self.right[i]]))
+        return nodes[-1]
+
+    def save(self, path):
+        """
+        Writes the tree to a file: a header followed by the raw arrays (widest first to keep them aligned)
+        and the variable names.
+        """
+        if sys.byteorder != 'little':
+            raise ValueError('Only little-endian platforms are supported')
+        names = '\n'.join(self.names).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.opcodes), len(names)))
+            for data in (self.values, self.left, self.right, self.opcodes):
+                f.write(bytes(memoryview(data).cast('B')))
+            f.write(names)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a file written by save(): the arrays are views of the mapped file, nothing is copied.
+        The tree must be closed to release the file.
+        """
+        if sys.byteorder != 'little':
+            raise ValueError('Only little-endian platforms are supported')
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, names_size = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            raise ValueError('Not an expression tree file: {}'.format(path))
+        view = memoryview(mapped)
+        offset = HEADER.size
+        arrays = []
+        for typecode, itemsize in (('d', 8), ('i', 4), ('i', 4), ('B', 1)):
+            arrays.append(view[offset:offset + count * itemsize].cast(typecode))
+            offset += count * itemsize
+        names = bytes(view[offset:offset + names_size]).decode('utf-8')
+        values, left, right, opcodes = arrays
+        tree = cls(opcodes, left, right, values, names.split('\n') if names else [])
+        tree._mmap = mapped
+        return tree
+
+    def close(self):
+        if self._mmap is not None:
+            for data in (self.values, self.left, self.right, self.opcodes):
+                data.release()
+            self._mmap.close()
+            self._mmap = None
+
+
+class ArrayEvaluator(object):
+    """
+    The Evaluator for the array trees: it walks the arrays in order instead of visiting the node objects.
+    """
+
+    def __init__(self, variables=None):
+        self.variables = variables or {}
+
+    def visit(self, tree):
+        opcodes, left, right, values, names = tree.opcodes, tree.left, tree.right, tree.values, tree.names
+        variables = self.variables
+        results = [0.0] * len(opcodes)
+        for i in range(len(opcodes)):
+            opcode = opcodes[i]
+            if opcode == NUMBER:
+                results[i] = values[i]
+            elif opcode == VARIABLE:
+                results[i] = variables[names[int(values[i])]]
+            elif opcode == ADD:
+                results[i] = results[left[i]] + results[right[i]]
+            elif opcode == SUB:
+                results[i] = results[left[i]] - results[right[i]]
+            elif opcode == MUL:
+                results[i] = results[left[i]] * results[right[i]]
+            elif opcode == DIV:
+                results[i] = results[left[i]] / results[right[i]]
+            else:
+                results[i] = -results[left[i]]
+        return results[-1]
+
+
+if __name__ == '__main__':
+    # Representation of 1 + 2 * (3 - x) / -5
+    tree = Add(Number(1), Div(Mul(Number(2), Sub(Number(3), Variable('x'))), Negate(Number(5))))
+    array_tree = ArrayTree.from_node(tree)
+    assert len(array_tree) == 10 and array_tree.opcodes[-1] == ADD
+    assert ArrayEvaluator({'x': 4}).visit(array_tree) == Evaluator({'x': 4}).visit(tree) == 1.4
+    assert Evaluator({'x': 4}).visit(array_tree.to_node()) == 1.4
+
+    big_tree = Variable('x')
+    for i in range(100000):
+        big_tree = Add(Mul(big_tree, Number(0.5)), Number(i))
+    big_array_tree = ArrayTree.from_node(big_tree)
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        big_array_tree.save(path)
+        loaded = ArrayTree.load(path)
+        try:
+            assert ArrayEvaluator({'x': 1}).visit(loaded) == ArrayEvaluator({'x': 1}).visit(big_array_tree)
+            loading = timeit.timeit(lambda: ArrayTree.load(path).close(), number=10)
+            evaluation = timeit.timeit(lambda: ArrayEvaluator({'x': 1}).visit(loaded), number=10)
+        finally:
+            loaded.close()
+        print('{} nodes, {} bytes on disk: load {:.4f}s, evaluation {:.4f}s per 10 runs'.format(
+            len(big_array_tree), os.path.getsize(path), loading, evaluation))
+    finally:
+        os.remove(path)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+A visitor does not have to compute anything by itself: it can translate a tree into another representation.
+Here a tree of nodes from the Visitor example is translated into the source code of a single Python function.
+Once compiled, the function evaluates the expression without any visitor dispatch, so it is much faster when
+the same tree is evaluated many times with different inputs.
+
+Every node becomes one assignment statement (instead of one deeply nested expression) and the tree is walked
+with an explicit stack, so even very deep trees hit neither the limits of the Python parser nor the recursion limit.
+The generated source describes the tree structure exactly, so it is also used as a key in the LRU cache of
+the compiled functions: structurally equal trees share the same compiled function.
+"""
+from functools import lru_cache
+import keyword
+import math
+import timeit
+
+from behavioral.visitor import NodeVisitor, Evaluator, BinaryOperator, UnaryOperator, Add, Sub, Mul, Div, Negate, \
+    Number, Variable
+
+
+class SourceGenerator(NodeVisitor):
+    """
+    Translates a tree into a list of assignment statements.
+    The leaves are visited by the visit_* methods which return an operand: a literal or an argument name.
+    The operators are translated in the post-order of the tree, every one of them into a temporary variable.
+    """
+
+    # Python operators for the operator nodes
+    operators = {'Add': '+', 'Sub': '-', 'Mul': '*', 'Div': '/', 'Negate': '-'}
+
+    def __init__(self):
+        self.statements = []
+        self.variables = set()
+
+    def generate(self, node):
+        """
+        Returns the source code of a function which evaluates the given tree.
+        """
+        result = self._translate(node)
+        args = ', '.join(sorted(self.variables))
+        body = ''.join('    {}\n'.format(statement) for statement in self.statements)
+        return 'def expression({}):\n{}    return {}\n'.format(args, body, result)
+
+    def _translate(self, root):
+        # operands of the already translated nodes by their ids
+        operands = {}
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if id(node) in operands:
+                continue
+            if isinstance(node, BinaryOperator):
+                if children_done:
+                    operands[id(node)] = self._temporary('{} {} {}'.format(
+                        operands[id(node.left)], self._operator(node), operands[id(node.right)]))
+                else:
+                    stack.extend([(node, True), (node.right, False), (node.left, False)])
+            elif isinstance(node, UnaryOperator):
+                if children_done:
+                    operands[id(node)] = self._temporary('{}{}'.format(
+                        self._operator(node), operands[id(node.operand)]))
+                else:
+                    stack.extend([(node, True), (node.operand, False)])
+            else:
+                operands[id(node)] = self.visit(node)
+        return operands[id(root)]
+
+    def _operator(self, node):
+        try:
+            return self.operators[type(node).__name__]
+        except KeyError:
+            return self.generic_visit(node)
+
+    def _temporary(self, expression):
+        name = '_t{}'.format(len(self.statements))
+        self.statements.append('{} = {}'.format(name, expression))
+        return name
+
+    def visit_Number(self, node):
+        value = float(node.value)
+        if math.isfinite(value):
+            return repr(value)
+        # repr() of nan and inf is not a valid Python literal
+        return "float('{!r}')".format(value)
+
+    def visit_Variable(self, node):
+        # temporary names start with an underscore, so inputs must not
+        if not node.name.isidentifier() or keyword.iskeyword(node.name) or node.name.startswith('_'):
+            raise ValueError('Invalid variable name: {!r}'.format(node.name))
+        self.variables.add(node.name)
+        return node.name
+
+
+@lru_cache(maxsize=1024)
+def _compile_source(source):
+    namespace = {}
+    exec(compile(source, '<expression>', 'exec'), namespace)
+    return namespace['expression']
+
+
+def compile_tree(node):
+    """
+    Compiles a tree into a function which takes the values of the variables as keyword arguments.
+    """
+    return _compile_source(SourceGenerator().generate(node))
+
+
+if __name__ == '__main__':
+    # Representation of 1 + 2 * (3 - x) / -y
+    tree = Add(Number(1), Div(Mul(Number(2), Sub(Number(3), Variable('x'))), Negate(Variable('y'))))
+    expression = compile_tree(tree)
+    assert expression(x=4, y=5) == Evaluator({'x': 4, 'y': 5}).visit(tree) == 1.4
+    assert expression(x=3, y=1) == 1.0
+    # a structurally equal tree reuses the already compiled function
+    same_tree = Add(Number(1), Div(Mul(Number(2), Sub(Number(3), Variable('x'))), Negate(Variable('y'))))
+    assert compile_tree(same_tree) is expression
+
+    # a deep tree does not hit the limits of the parser or the recursion limit
+    deep_tree = Variable('x')
+    for i in range(5000):
+        deep_tree = Add(deep_tree, Number(1))
+    assert compile_tree(deep_tree)(x=1) == 5001
+
+    assert compile_tree(Add(Number(float('inf')), Variable('x')))(x=1) == float('inf')
+    assert math.isnan(compile_tree(Mul(Number(float('nan')), Number(2)))())
+    try:
+        compile_tree(Variable('if'))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('keywords are not valid variable names')
+
+    evaluator = Evaluator({'x': 4, 'y': 5})
+    visited = timeit.timeit(lambda: evaluator.visit(tree), number=10000)
+    compiled = timeit.timeit(lambda: expression(x=4, y=5), number=10000)
+    print('Evaluator: {:.4f}s, compiled: {:.4f}s per 10000 evaluations'.format(visited, compiled))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+Generated trees often contain the same subtrees many times, ex. Sub(Number(3), Number(4)).
+A visitor may rebuild such a tree into a DAG (directed acyclic graph) where equal subtrees are represented by
+a single shared node: this technique is called hash-consing or common subexpression elimination (CSE).
+Every node is looked up in a table by its type and its (already shared) children before a new one is created.
+
+A shared node is still evaluated once per reference by the ordinary Evaluator, so the memoizing evaluator below
+remembers the value of every node it has already computed.
+
+Both visitors process the new nodes in the post-order given by post_order(), which walks the tree with an explicit
+stack: when a node is visited its children are already known, so the depth of a tree is not limited by recursion.
+"""
+import timeit
+
+from behavioral.visitor import NodeVisitor, Evaluator, BinaryOperator, UnaryOperator, Add, Sub, Number, Variable
+
+
+def post_order(root, done=()):
+    """
+    Yields the unique nodes reachable from the root, every node after its children, without recursion.
+    The nodes whose ids are in done are neither yielded nor entered.
+    """
+    seen = set()
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            yield node
+        elif id(node) not in seen and id(node) not in done:
+            seen.add(id(node))
+            stack.append((node, True))
+            if isinstance(node, BinaryOperator):
+                stack.extend([(node.right, False), (node.left, False)])
+            elif isinstance(node, UnaryOperator):
+                stack.append((node.operand, False))
+
+
+class CommonSubexpressionEliminator(NodeVisitor):
+    """
+    Turns a tree into a DAG in which structurally equal subtrees are the same node object.
+    The same instance may be used for many trees: the subtrees shared between them are shared as well.
+    """
+
+    def __init__(self):
+        # unique nodes by their keys: (node type, value or children ids)
+        self._nodes = {}
+        # already processed input nodes by their ids, so a DAG given as an input is not walked exponentially
+        self._seen = {}
+
+    def visit(self, node):
+        try:
+            return self._seen[id(node)][1]
+        except KeyError:
+            # the children are processed first, so visiting a node only looks its children up in _seen
+            for unseen in post_order(node, self._seen):
+                # the input node is kept along with the result to make sure its id is not reused
+                self._seen[id(unseen)] = (unseen, super(CommonSubexpressionEliminator, self).visit(unseen))
+            return self._seen[id(node)][1]
+
+    def _intern(self, key, factory):
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = factory()
+        return node
+
+    def visit_Number(self, node):
+        return self._intern((Number, float(node.value)), lambda: Number(node.value))
+
+    def visit_Variable(self, node):
+        return self._intern((Variable, node.name), lambda: Variable(node.name))
+
+    def _visit_binary(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        return self._intern((type(node), id(left), id(right)), lambda: type(node)(left, right))
+
+    def _visit_unary(self, node):
+        operand = self.visit(node.operand)
+        return self._intern((type(node), id(operand)), lambda: type(node)(operand))
+
+    def generic_visit(self, node):
+        if isinstance(node, BinaryOperator):
+            return self._visit_binary(node)
+        if isinstance(node, UnaryOperator):
+            return self._visit_unary(node)
+        return super(CommonSubexpressionEliminator, self).generic_visit(node)
+
+
+class MemoizingEvaluator(Evaluator):
+    """
+    Computes every unique node only once: the values are remembered by the node ids.
+    A new instance must be used once the variables or the tree change.
+    """
+
+    def __init__(self, variables=None):
+        super(MemoizingEvaluator, self).__init__(variables)
+        self._values = {}
+
+    def visit(self, node):
+        try:
+            return self._values[id(node)]
+        except KeyError:
+            # the children are computed first, so computing a node only looks its children up in _values
+            for unknown in post_order(node, self._values):
+                self._values[id(unknown)] = super(MemoizingEvaluator, self).visit(unknown)
+            return self._values[id(node)]
+
+
+def count_nodes(node):
+    """
+    Returns the number of node references and the number of unique node objects reachable from the given node.
+    """
+    references = 0
+    unique = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        references += 1
+        if id(node) in unique:
+            continue
+        unique.add(id(node))
+        if isinstance(node, BinaryOperator):
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, UnaryOperator):
+            stack.append(node.operand)
+    return references, len(unique)
+
+
+if __name__ == '__main__':
+    def build(depth):
+        # both halves of every Add are equal, but they are different objects
+        if depth == 0:
+            return Sub(Number(3), Variable('x'))
+        return Add(build(depth - 1), build(depth - 1))
+
+    tree = build(14)
+    dag = CommonSubexpressionEliminator().visit(tree)
+    assert count_nodes(tree) == (2 ** 14 * 4 - 1, 2 ** 14 * 4 - 1)
+    assert count_nodes(dag)[1] == 14 + 3
+    assert dag.left is dag.right
+
+    expected = Evaluator({'x': 1}).visit(tree)
+    assert MemoizingEvaluator({'x': 1}).visit(dag) == expected == 2 ** 15
+
+    # a chain much deeper than the recursion limit
+    chain = Variable('x')
+    for i in range(10000):
+        chain = Add(chain, Sub(Number(i), Number(i)))
+    assert MemoizingEvaluator({'x': 1}).visit(CommonSubexpressionEliminator().visit(chain)) == 1
+    assert count_nodes(CommonSubexpressionEliminator().visit(chain))[1] < count_nodes(chain)[1]
+
+    before = timeit.timeit(lambda: Evaluator({'x': 1}).visit(tree), number=10)
+    after = timeit.timeit(lambda: MemoizingEvaluator({'x': 1}).visit(dag), number=10)
+    print('tree: {} nodes, {:.4f}s; DAG: {} nodes, {:.4f}s per 10 evaluations'.format(
+        count_nodes(tree)[1], before, count_nodes(dag)[1], after))
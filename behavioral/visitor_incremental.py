@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+When only a few inputs of a very large tree change between evaluations there is no need to evaluate
+the whole tree again.
+The incremental evaluator remembers the value of every node and the parents of every node.
+When a Number value or a variable binding changes, only the nodes on the path from the changed leaf
+to the root are computed again, so an update costs O(depth) instead of O(n).
+
+The dirty nodes are processed in the post-order of the tree: every child is computed before its parents,
+which is also correct for DAGs built by the CommonSubexpressionEliminator.
+A parent is not recomputed at all if the value of its child has not actually changed.
+"""
+import heapq
+import timeit
+
+from behavioral.visitor import Evaluator, BinaryOperator, UnaryOperator, Add, Mul, Number, Variable
+from behavioral.visitor_cse import MemoizingEvaluator
+
+
+class IncrementalEvaluator(MemoizingEvaluator):
+    """
+    Evaluates a tree once and then keeps its value up to date on changes of the leaves.
+    """
+
+    def __init__(self, root, variables=None):
+        super(IncrementalEvaluator, self).__init__(variables)
+        self.root = root
+        # parents and post-order positions of the nodes by their ids
+        self._parents = {}
+        self._order = {}
+        # Variable nodes by their names
+        self._variable_nodes = {}
+        # the number of nodes computed by the last update
+        self.recomputed = 0
+        self._index(root)
+        self.value = self.visit(root)
+
+    def _index(self, root):
+        self._parents[id(root)] = []
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                self._order[id(node)] = len(self._order)
+                continue
+            if id(node) in self._order:
+                continue
+            stack.append((node, True))
+            if isinstance(node, BinaryOperator):
+                children = [node.left, node.right]
+            elif isinstance(node, UnaryOperator):
+                children = [node.operand]
+            else:
+                children = []
+                if isinstance(node, Variable):
+                    self._variable_nodes.setdefault(node.name, []).append(node)
+            for child in children:
+                seen = id(child) in self._parents
+                self._parents.setdefault(id(child), []).append(node)
+                if not seen:
+                    stack.append((child, False))
+
+    def set_number(self, node, value):
+        """
+        Changes the value of a Number node of the tree.
+        """
+        node.value = value
+        return self._update([node])
+
+    def set_variable(self, name, value):
+        """
+        Changes the binding of a variable.
+        """
+        self.variables[name] = value
+        return self._update(self._variable_nodes.get(name, []))
+
+    def _update(self, leaves):
+        self.recomputed = 0
+        dirty = [(self._order[id(node)], id(node), node) for node in leaves]
+        heapq.heapify(dirty)
+        queued = set(item[1] for item in dirty)
+        while dirty:
+            _, node_id, node = heapq.heappop(dirty)
+            old = self._values[node_id]
+            # Evaluator.visit computes the node itself while its children are taken from the cache
+            new = self._values[node_id] = Evaluator.visit(self, node)
+            self.recomputed += 1
+            if new == old:
+                continue
+            for parent in self._parents[node_id]:
+                if id(parent) not in queued:
+                    queued.add(id(parent))
+                    heapq.heappush(dirty, (self._order[id(parent)], id(parent), parent))
+        self.value = self._values[id(self.root)]
+        return self.value
+
+
+if __name__ == '__main__':
+    def build(first, last):
+        # a balanced tree which sums up x_first * first + ... + x_last * last
+        if first == last:
+            return Mul(Variable('x{}'.format(first)), Number(first))
+        middle = (first + last) // 2
+        return Add(build(first, middle), build(middle + 1, last))
+
+    size = 2 ** 14
+    tree = build(0, size - 1)
+    variables = dict(('x{}'.format(i), 1) for i in range(size))
+    incremental = IncrementalEvaluator(tree, variables)
+    assert incremental.value == sum(range(size))
+
+    assert incremental.set_variable('x5', 3) == sum(range(size)) + 10
+    # the leaf, its Mul node and 14 Add nodes up to the root
+    assert incremental.recomputed == 16
+    # changing a Number node works the same way
+    mul = tree.left.left.left.left.left.left.left.left.left.left.left.left.left.left
+    assert mul.right.value == 0
+    assert incremental.set_number(mul.right, 100) == sum(range(size)) + 10 + 100
+    assert incremental.value == Evaluator(variables).visit(tree)
+    # nothing is propagated if the value has not changed
+    incremental.set_variable('x7', 1)
+    assert incremental.recomputed == 1
+
+    # a chain much deeper than the recursion limit
+    chain = Variable('x')
+    for i in range(10000):
+        chain = Add(chain, Number(1))
+    deep = IncrementalEvaluator(chain, {'x': 0})
+    assert deep.value == 10000 and deep.set_variable('x', 5) == 10005 and deep.recomputed == 10001
+
+    full = timeit.timeit(lambda: Evaluator(variables).visit(tree), number=10)
+    update = timeit.timeit(lambda: incremental.set_variable('x5', 4), number=10)
+    print('{} nodes: full evaluation {:.4f}s, incremental update {:.4f}s per 10 updates'.format(
+        len(incremental._order), full, update))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+A visitor may also transform a tree into an equivalent but cheaper one.
+The ConstantFolder below replaces every operator whose operands are all numbers with a single Number node,
+so the constant parts of an expression are computed once at optimization time instead of at every evaluation.
+The arithmetic itself is delegated to the Evaluator, so the folded tree always gives the same result.
+The nodes are folded in the post-order given by post_order(), so even very deep trees do not hit the recursion limit.
+"""
+from behavioral.visitor import NodeVisitor, Evaluator, BinaryOperator, UnaryOperator, Add, Sub, Mul, Div, Negate, \
+    Number, Variable
+from behavioral.visitor_cse import post_order
+
+
+class ConstantFolder(NodeVisitor):
+    """
+    Returns a new tree with all the constant subtrees folded into Number nodes. The original tree is not modified.
+    A node shared by several parents (ex. in a DAG built by the CommonSubexpressionEliminator) is folded once
+    and stays shared in the result.
+    """
+
+    def __init__(self):
+        self._evaluator = Evaluator()
+        # already folded nodes by the ids of the input nodes, the input node is kept so its id is not reused
+        self._folded = {}
+
+    def visit(self, node):
+        try:
+            return self._folded[id(node)][1]
+        except KeyError:
+            # the children are folded first, so folding a node only looks its children up in _folded
+            for unfolded in post_order(node, self._folded):
+                self._folded[id(unfolded)] = (unfolded, super(ConstantFolder, self).visit(unfolded))
+            return self._folded[id(node)][1]
+
+    def _fold(self, node):
+        try:
+            return Number(self._evaluator.visit(node))
+        except ZeroDivisionError:
+            # leave the error to be raised at the evaluation time
+            return node
+
+    def visit_Number(self, node):
+        return node
+
+    def visit_Variable(self, node):
+        return node
+
+    def generic_visit(self, node):
+        if isinstance(node, BinaryOperator):
+            folded = type(node)(self.visit(node.left), self.visit(node.right))
+            if isinstance(folded.left, Number) and isinstance(folded.right, Number):
+                return self._fold(folded)
+            return folded
+        if isinstance(node, UnaryOperator):
+            folded = type(node)(self.visit(node.operand))
+            if isinstance(folded.operand, Number):
+                return self._fold(folded)
+            return folded
+        return super(ConstantFolder, self).generic_visit(node)
+
+
+if __name__ == '__main__':
+    # Representation of x + 2 * (3 - 4) / -5
+    tree = Add(Variable('x'), Div(Mul(Number(2), Sub(Number(3), Number(4))), Negate(Number(5))))
+    folded = ConstantFolder().visit(tree)
+    assert isinstance(folded, Add) and isinstance(folded.left, Variable)
+    assert isinstance(folded.right, Number) and folded.right.value == 0.4
+    assert Evaluator({'x': 1}).visit(folded) == Evaluator({'x': 1}).visit(tree) == 1.4
+    # the shared subtrees of a DAG stay shared
+    shared = Add(Variable('x'), Mul(Number(2), Number(3)))
+    dag = Mul(shared, shared)
+    folded = ConstantFolder().visit(dag)
+    assert folded.left is folded.right and folded.left.right.value == 6
+
+    # a chain much deeper than the recursion limit
+    chain = Variable('x')
+    for i in range(10000):
+        chain = Add(chain, Mul(Number(i), Number(2)))
+    folded = ConstantFolder().visit(chain)
+    assert isinstance(folded.right, Number) and folded.right.value == 9999 * 2
+
+    # division by zero is not folded
+    assert isinstance(ConstantFolder().visit(Div(Number(1), Number(0))), Div)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+Trees for the Visitor example do not have to be built by hand: they can be parsed from a text like "1 + 2 * (3 - x)".
+The text is split into tokens by a single compiled regular expression and the tokens are turned into a tree
+by a precedence climbing parser: a chain of operators of the same precedence is handled by a loop,
+so only parentheses and unary minuses need recursion.
+"""
+import re
+import timeit
+
+from behavioral.visitor import Evaluator, Add, Sub, Mul, Div, Negate, Number, Variable
+
+
+class Parser(object):
+    """
+    Parses expressions with numbers, variables, + - * / operators, unary minus and parentheses.
+    One instance may be used to parse any number of expressions.
+    """
+
+    # every token is a tuple of (number, name, operator) where only one item is not empty
+    _tokenize = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*)|(\S))').findall
+
+    # precedence and node class of the binary operators
+    binary_operators = {'+': (1, Add), '-': (1, Sub), '*': (2, Mul), '/': (2, Div)}
+
+    def __init__(self):
+        self._tokens = []
+        self._position = 0
+
+    def parse(self, text):
+        self._tokens = self._tokenize(text)
+        self._position = 0
+        node = self._expression(1)
+        if self._position != len(self._tokens):
+            self._error('Unexpected token')
+        return node
+
+    def parse_many(self, texts):
+        """
+        Parses a batch of expressions and returns a list of trees.
+        """
+        parse = self.parse
+        return [parse(text) for text in texts]
+
+    def _error(self, message):
+        if self._position < len(self._tokens):
+            message += ' {!r}'.format(''.join(self._tokens[self._position]))
+        raise ValueError('{} at token {}'.format(message, self._position))
+
+    def _expression(self, min_precedence):
+        tokens = self._tokens
+        left = self._operand()
+        while self._position < len(tokens):
+            operator = self.binary_operators.get(tokens[self._position][2])
+            if operator is None or operator[0] < min_precedence:
+                break
+            self._position += 1
+            precedence, node_class = operator
+            # all the operators are left-associative: the right operand binds only the higher precedence operators
+            left = node_class(left, self._expression(precedence + 1))
+        return left
+
+    def _operand(self):
+        if self._position >= len(self._tokens):
+            self._error('Unexpected end of expression')
+        number, name, operator = self._tokens[self._position]
+        self._position += 1
+        if number:
+            return Number(float(number))
+        if name:
+            return Variable(name)
+        if operator == '-':
+            return Negate(self._operand())
+        if operator == '+':
+            return self._operand()
+        if operator == '(':
+            node = self._expression(1)
+            if self._position >= len(self._tokens) or self._tokens[self._position][2] != ')':
+                self._error('Expected ")"')
+            self._position += 1
+            return node
+        self._position -= 1
+        self._error('Unexpected token')
+
+
+if __name__ == '__main__':
+    parser = Parser()
+    tree = parser.parse('1 + 2 * (3 - 4) / 5')
+    assert isinstance(tree, Add) and isinstance(tree.right, Div)
+    assert Evaluator().visit(tree) == 0.6
+    assert Evaluator({'x': 2}).visit(parser.parse('-x * -(1.5e1 - .5) - 10 - 2')) == 17
+    assert Evaluator().visit(parser.parse('8 / 4 / 2')) == 1
+    for text in ('1 +', '(1', '1 2', '1 $ 2', ''):
+        try:
+            parser.parse(text)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(text)
+
+    texts = ['{} + {} * (x - {}) / -{}'.format(i, i + 1, i + 2, i + 3) for i in range(100000)]
+    assert len(parser.parse_many(texts)) == len(texts)
+    elapsed = timeit.timeit(lambda: parser.parse_many(texts), number=1)
+    print('{:.0f} expressions per second'.format(len(texts) / elapsed))
@@ -13,6 +13,8 @@ class ThinCrust(object):
     A concrete ingredient
     """
 
+    __slots__ = ()
+
     def __str__(self):
         return 'Thin crust'
 
@@ -22,6 +24,8 @@ class PuffPastry(object):
     A concrete ingredient
     """
 
+    __slots__ = ()
+
     def __str__(self):
         return 'Puff pastry'
 
@@ -31,6 +35,8 @@ class Cheese(object):
     A concrete ingredient
     """
 
+    __slots__ = ()
+
     def __str__(self):
         return 'Cheese'
 
@@ -40,6 +46,8 @@ class Bacon(object):
     A concrete ingredient
     """
 
+    __slots__ = ()
+
     def __str__(self):
         return 'Bacon'
 
@@ -49,6 +57,9 @@ class Pizza(object):
     Pizza
     """
 
+    # no __dict__ per instance: a lot of pizzas may be baked
+    __slots__ = ('dough', 'filling')
+
     def __init__(self, dough_cls, filling_cls):
         self.dough = dough_cls()
         self.filling = filling_cls()
@@ -57,6 +68,10 @@ class Pizza(object):
         return 'Pizza with {} and {}'.format(str(self.dough), str(self.filling))
 
 
+# the Java-style Pizza below takes this name, this one stays importable as ClassPizza
+ClassPizza = Pizza
+
+
 if __name__ == '__main__':
     # in Python we don't need a dedicated factory class since we may pass the needed classes as arguments
     italian_pizza = Pizza(ThinCrust, Cheese)
@@ -110,6 +125,8 @@ class Pizza(object):
     Pizza
     """
 
+    __slots__ = ('dough', 'filling')
+
     def __init__(self, factory):
         self.dough = factory.create_dough()
         self.filling = factory.create_filling()
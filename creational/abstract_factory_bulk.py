@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+Baking pizzas one by one in a loop pays for the same lookups on every iteration: the Pizza class, the factory methods
+and the __init__ call itself.
+The bulk functions below look everything up once before the loop and fill the pizza slots directly,
+both for the Python-style (the ingredient classes are passed, ClassPizza) and for the Java-style (a factory is passed,
+Pizza) variants of the Abstract Factory example.
+Pizza.__init__ is not called: the pizzas get exactly the attributes their __init__ would set.
+The products declare __slots__, so a pizza does not carry a __dict__ either.
+"""
+import timeit
+import tracemalloc
+
+from creational.abstract_factory import ThinCrust, Cheese, ItalianIngredientsFactory, ClassPizza, Pizza
+
+
+def create_many(factory, n):
+    """
+    Returns a list of n Pizza instances made of the ingredients created by the factory.
+    """
+    return _bake(Pizza, factory.create_dough, factory.create_filling, n)
+
+
+def create_many_from_classes(dough_cls, filling_cls, n):
+    """
+    Returns a list of n ClassPizza instances made of the instances of the given ingredient classes.
+    """
+    return _bake(ClassPizza, dough_cls, filling_cls, n)
+
+
+def _bake(pizza_cls, create_dough, create_filling, n):
+    # the pizza is filled directly: both Pizza variants store the same two attributes
+    new = pizza_cls.__new__
+    pizzas = []
+    append = pizzas.append
+    for _ in range(n):
+        pizza = new(pizza_cls)
+        pizza.dough = create_dough()
+        pizza.filling = create_filling()
+        append(pizza)
+    return pizzas
+
+
+def _bytes_per_object(bake, n):
+    tracemalloc.start()
+    try:
+        pizzas = bake(n)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return size / float(len(pizzas))
+
+
+class DictPizza(Pizza):
+    """
+    A pizza with __dict__ for comparison: a subclass without __slots__ gets a __dict__ again.
+    """
+
+
+if __name__ == '__main__':
+    factory = ItalianIngredientsFactory()
+    pizzas = create_many(factory, 3)
+    assert all(type(pizza) is Pizza for pizza in pizzas)
+    assert len(pizzas) == 3 and all(str(pizza) == 'Pizza with Thin crust and Cheese' for pizza in pizzas)
+    pizzas = create_many_from_classes(ThinCrust, Cheese, 3)
+    assert all(type(pizza) is ClassPizza for pizza in pizzas)
+    assert len(pizzas) == 3 and all(str(pizza) == 'Pizza with Thin crust and Cheese' for pizza in pizzas)
+    assert not hasattr(pizzas[0], '__dict__')
+
+    n = 10 ** 6
+    loop = timeit.timeit(lambda: [Pizza(factory) for _ in range(n)], number=1)
+    bulk = timeit.timeit(lambda: create_many(factory, n), number=1)
+    print('pizzas per second at {}: loop {:.0f}, create_many {:.0f}'.format(n, n / loop, n / bulk))
+    print('bytes per pizza with ingredients: __dict__ {:.0f}, __slots__ {:.0f}'.format(
+        _bytes_per_object(lambda n: [DictPizza(factory) for _ in range(n)], n),
+        _bytes_per_object(lambda n: create_many(factory, n), n)))
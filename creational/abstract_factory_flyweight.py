@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+The factories in the Abstract Factory example create a new ingredient on every call, although the ingredients
+are immutable and stateless: one ThinCrust is as good as another one.
+When millions of pizzas are baked it is a pure allocation overhead.
+
+1. FlyweightFactory wraps a factory and returns a shared instance of every product (the Flyweight pattern).
+   It is opt-in: wrap only the factories whose products are immutable.
+2. ObjectPool keeps the released instances of mutable products and hands them out again instead of creating
+   new ones: the instance must be released when it is not used anymore.
+"""
+import sys
+import threading
+import timeit
+
+from creational.abstract_factory import ItalianIngredientsFactory, AmericanIngredientsFactory, Pizza
+
+
+class FlyweightFactory(object):
+    """
+    Wraps a factory: every create_* method of the factory is called once, the created product is shared.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        for name in dir(factory):
+            if name.startswith('create_'):
+                setattr(self, name, self._shared(getattr(factory, name)))
+
+    @staticmethod
+    def _shared(create):
+        product = []
+
+        def create_shared():
+            if not product:
+                # two threads may create two instances here, but only the first one is kept
+                product.append(create())
+            return product[0]
+
+        return create_shared
+
+
+class ObjectPool(object):
+    """
+    A pool of the reusable instances of a mutable product.
+    The reset callable is called on a released instance to bring it to the initial state.
+    At most maxsize released instances are kept.
+    """
+
+    def __init__(self, create, reset=None, maxsize=None):
+        self.create = create
+        self.reset = reset
+        self.maxsize = maxsize
+        self.created = 0
+        self._free = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self):
+        try:
+            # list.pop is atomic, so no lock is needed here
+            return self._free.pop()
+        except IndexError:
+            with self._lock:
+                self.created += 1
+            return self.create()
+
+    def release(self, instance):
+        if self.reset is not None:
+            self.reset(instance)
+        if self.maxsize is None or len(self._free) < self.maxsize:
+            self._free.append(instance)
+
+
+def _allocated_blocks(bake, count=100000):
+    """
+    Returns the number of memory blocks retained by the given number of pizzas.
+    """
+    before = sys.getallocatedblocks()
+    pizzas = [bake() for _ in range(count)]
+    blocks = sys.getallocatedblocks() - before
+    del pizzas
+    return blocks
+
+
+if __name__ == '__main__':
+    italian = FlyweightFactory(ItalianIngredientsFactory())
+    pizza1 = Pizza(italian)
+    pizza2 = Pizza(italian)
+    assert str(pizza1) == str(pizza2) == 'Pizza with Thin crust and Cheese'
+    assert pizza1.dough is pizza2.dough and pizza1.filling is pizza2.filling
+
+    american = AmericanIngredientsFactory()
+    pool = ObjectPool(lambda: Pizza(american), maxsize=10)
+    pizza = pool.acquire()
+    assert str(pizza) == 'Pizza with Puff pastry and Bacon'
+    pool.release(pizza)
+    assert pool.acquire() is pizza and pool.created == 1
+
+    plain = ItalianIngredientsFactory()
+    print('memory blocks per 100000 pizzas: plain {}, flyweight {}'.format(
+        _allocated_blocks(lambda: Pizza(plain)), _allocated_blocks(lambda: Pizza(italian))))
+    print('100000 pizzas: plain {:.4f}s, flyweight {:.4f}s'.format(
+        timeit.timeit(lambda: Pizza(plain), number=100000), timeit.timeit(lambda: Pizza(italian), number=100000)))
+
+    def bake_and_release():
+        pool.release(pool.acquire())
+
+    print('100000 pizzas: new {:.4f}s, pooled {:.4f}s'.format(
+        timeit.timeit(lambda: Pizza(american), number=100000), timeit.timeit(bake_and_release, number=100000)))
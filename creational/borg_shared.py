@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""
+The Borg in the Borg example shares its state only within one interpreter: every worker process
+ends up with its own "shared" state.
+The SharedBorg below keeps the state in a memory-mapped file, so all the processes which map the same file
+share the same state.
+
+The state is stored in a compact binary form: an index of the attribute names with the offsets of their values
+followed by the values encoded with marshal. A reader decodes only the values it actually accesses.
+Every write increments a version number in the header of the file: a reader compares it with the version
+it has seen last time, so picking up the changes of other processes costs a single integer read.
+Writers are serialized by a file lock, readers don't lock the file at all: the version is odd while a write
+is in progress and the readers retry if the version has changed while they were copying the data (a "seqlock").
+The file lock does not serialize the threads of one process (they share the open file), so the threads
+are serialized by a threading lock as well, which also protects the cached data of the SharedState.
+POSIX only since fcntl is used for the file lock.
+"""
+import fcntl
+import marshal
+import mmap
+import os
+import struct
+import threading
+import time
+
+# version, size of the data
+HEADER = struct.Struct('<QI')
+# number of the attributes
+COUNT = struct.Struct('<I')
+# name length, value offset, value length
+ENTRY = struct.Struct('<HII')
+
+
+def _encode(entries):
+    """
+    Encodes a list of (name, encoded value) pairs.
+    """
+    names = [name.encode('utf-8') for name, _ in entries]
+    offset = COUNT.size + sum(ENTRY.size + len(name) for name in names)
+    index = [COUNT.pack(len(entries))]
+    for name, (_, value) in zip(names, entries):
+        index.append(ENTRY.pack(len(name), offset, len(value)))
+        index.append(name)
+        offset += len(value)
+    return b''.join(index + [value for _, value in entries])
+
+
+def _decode_index(data):
+    """
+    Returns the (offset, length) pairs of the values by their names. The values themselves are not decoded.
+    """
+    index = {}
+    position = COUNT.size
+    for _ in range(COUNT.unpack_from(data)[0]):
+        name_length, offset, length = ENTRY.unpack_from(data, position)
+        position += ENTRY.size
+        index[bytes(data[position:position + name_length]).decode('utf-8')] = (offset, length)
+        position += name_length
+    return index
+
+
+class SharedState(object):
+    """
+    A mapping of the attribute names to the values stored in a memory-mapped file.
+    The values must be supported by marshal: numbers, strings, bytes, and lists, tuples, dicts of them.
+    """
+
+    def __init__(self, path, size=65536):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < size:
+            self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        # the version and the data seen last time along with the values decoded so far
+        self._version = None
+        self._data = b''
+        self._index = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        # must be called with self._lock held
+        while True:
+            version = HEADER.unpack_from(self._mmap)[0]
+            if version == self._version:
+                return
+            if version % 2:
+                # a write is in progress: let the writer run instead of spinning
+                time.sleep(0.0001)
+                continue
+            size = HEADER.unpack_from(self._mmap)[1]
+            data = self._mmap[HEADER.size:HEADER.size + size]
+            # the data is consistent only if nobody has started writing while we were copying it
+            if HEADER.unpack_from(self._mmap)[0] == version:
+                self._version = version
+                self._data = data
+                self._index = _decode_index(data) if data else {}
+                self._values = {}
+                return
+
+    @property
+    def version(self):
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def get(self, name):
+        with self._lock:
+            self._refresh()
+            try:
+                return self._values[name]
+            except KeyError:
+                offset, length = self._index[name]
+                value = self._values[name] = marshal.loads(self._data[offset:offset + length])
+                return value
+
+    def keys(self):
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def update(self, values):
+        """
+        Sets several attributes in one write, so the readers see either all of them or none.
+        """
+        with self._lock:
+            self._write(values)
+
+    def _write(self, values):
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            version, size = HEADER.unpack_from(self._mmap)
+            if version % 2:
+                # nobody else holds the lock: a writer has died in the middle of a write, so the data can not be
+                # trusted. It is dropped and the version is made even again, otherwise the readers would wait forever
+                version, size = version + 1, 0
+            data = self._mmap[HEADER.size:HEADER.size + size]
+            # the unchanged values are copied as is without decoding
+            entries = [(name, data[offset:offset + length]) for name, (offset, length)
+                       in (_decode_index(data) if data else {}).items() if name not in values]
+            entries.extend((name, marshal.dumps(value)) for name, value in values.items())
+            data = _encode(entries)
+            if HEADER.size + len(data) > len(self._mmap):
+                raise ValueError('Shared state does not fit into {} bytes'.format(len(self._mmap)))
+            # an odd version tells the readers that a write is in progress
+            HEADER.pack_into(self._mmap, 0, version + 1, size)
+            self._mmap[HEADER.size:HEADER.size + len(data)] = data
+            HEADER.pack_into(self._mmap, 0, version + 2, len(data))
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def close(self):
+        with self._lock:
+            self._mmap.close()
+            self._file.close()
+
+
+class SharedBorg(object):
+    """
+    All the instances of a subclass share the state stored in its _shared_state, even in different processes.
+    """
+
+    _shared_state = None
+
+    def __getattr__(self, item):
+        try:
+            return self._shared_state.get(item)
+        except KeyError:
+            raise AttributeError(item)
+
+    def __setattr__(self, key, value):
+        self._shared_state.update({key: value})
+
+    def update(self, **values):
+        self._shared_state.update(values)
+
+
+def _change_credentials(path):
+    # runs in a separate process
+    state = SharedState(path)
+    state.update({'login': 'admin', 'password': 'password'})
+    state.close()
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    import tempfile
+
+    class Borg(SharedBorg):
+        def __init__(self, login, password):
+            # both attributes are changed at once
+            self.update(login=login, password=password)
+
+    with tempfile.NamedTemporaryFile() as f:
+        Borg._shared_state = SharedState(f.name)
+        b1 = Borg('root', 'pass')
+        assert b1.login == 'root' and b1.password == 'pass'
+        version = Borg._shared_state.version
+
+        worker = multiprocessing.Process(target=_change_credentials, args=(f.name,))
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+        # the changes of another process are visible here
+        assert b1.login == 'admin' and b1.password == 'password'
+        assert Borg._shared_state.version == version + 2
+
+        b1.timeout = 30
+        assert sorted(Borg._shared_state.keys()) == ['login', 'password', 'timeout']
+
+        # a writer which has died in the middle of a write leaves an odd version: the next write recovers
+        version = Borg._shared_state.version
+        HEADER.pack_into(Borg._shared_state._mmap, 0, version + 1, 0)
+        b1.timeout = 60
+        assert Borg._shared_state.version == version + 4 and Borg._shared_state.keys() == ['timeout']
+        b1.update(login='admin', password='password')
+
+        # the threads of this process do not lose each other's updates
+        def count(name):
+            for i in range(100):
+                Borg._shared_state.update({name: i})
+
+        threads = [threading.Thread(target=count, args=('counter{}'.format(i),)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert [b1.counter0, b1.counter1, b1.counter2, b1.counter3] == [99] * 4
+        Borg._shared_state.close()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+All the Borg instances in the Borg example share the same mutable __dict__, so a thread reading the state while
+another thread updates it may see a half-updated state, ex. a new login with an old password.
+
+The SnapshotBorg below never modifies the shared state in place. The state is an immutable snapshot:
+a writer copies it, applies all the changes of a transaction to the copy and then publishes the copy with
+a single attribute assignment, which is atomic in Python.
+So the readers don't need any lock: they take the current snapshot and get a consistent view of all the attributes.
+"""
+from contextlib import contextmanager
+import threading
+import time
+
+
+class Snapshot(object):
+    """
+    An immutable version of the shared state.
+    The values are kept in the instance __dict__, so reading an attribute is an ordinary attribute lookup.
+    The names which would clash with the attributes of the Snapshot itself (ex. version) are rejected.
+    """
+
+    def __init__(self, values, version):
+        values = dict(values)
+        reserved = [name for name in values if name == '_version' or hasattr(Snapshot, name)]
+        if reserved:
+            raise ValueError('Reserved attribute names: {}'.format(', '.join(sorted(reserved))))
+        values['_version'] = version
+        object.__setattr__(self, '__dict__', values)
+
+    @property
+    def version(self):
+        return self._version
+
+    def __setattr__(self, key, value):
+        raise AttributeError('Snapshot is immutable')
+
+    def __delattr__(self, item):
+        raise AttributeError('Snapshot is immutable')
+
+    def as_dict(self):
+        values = dict(self.__dict__)
+        del values['_version']
+        return values
+
+
+class SharedSnapshot(object):
+    """
+    Keeps the current snapshot. Only the writers take the lock.
+    """
+
+    def __init__(self):
+        self.current = Snapshot({}, 0)
+        # reentrant, so a transaction may be started inside another one in the same thread
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Collects the changes into a dictionary and publishes them all at once at the end of the block.
+        A nested transaction joins the outer one: its changes are published at the end of the outer block.
+        """
+        with self._lock:
+            changes = getattr(self._local, 'changes', None)
+            if changes is not None:
+                yield changes
+                return
+            changes = self._local.changes = {}
+            try:
+                yield changes
+            finally:
+                self._local.changes = None
+            if changes:
+                values = self.current.as_dict()
+                values.update(changes)
+                # the only modification of the shared state: an atomic reference swap
+                self.current = Snapshot(values, self.current.version + 1)
+
+
+class SnapshotBorg(object):
+    """
+    All the instances of a class and its subclasses share the same state unless a subclass defines its own _shared.
+    """
+
+    _shared = SharedSnapshot()
+
+    def snapshot(self):
+        """
+        Returns a consistent view of all the attributes: use it to read several related attributes.
+        """
+        return self._shared.current
+
+    def transaction(self):
+        return self._shared.transaction()
+
+    def __getattr__(self, item):
+        return getattr(self._shared.current, item)
+
+    def __setattr__(self, key, value):
+        with self._shared.transaction() as changes:
+            changes[key] = value
+
+
+class Borg(SnapshotBorg):
+    def __init__(self, login, password):
+        # both attributes are published at once
+        with self.transaction() as changes:
+            changes['login'] = login
+            changes['password'] = password
+
+
+class LockedBorg(object):
+    """
+    The alternative for comparison: the classic Borg which takes a lock to read or write the state.
+    """
+
+    _shared_state = {}
+    _lock = threading.Lock()
+
+    def __init__(self, login, password):
+        self.__dict__ = self._shared_state
+        with self._lock:
+            self.login = login
+            self.password = password
+
+    def credentials(self):
+        with self._lock:
+            return self.login, self.password
+
+
+def benchmark(read, write, readers=4, duration=0.5):
+    """
+    Runs the reader threads and one writer thread for the given duration, returns the total number of reads.
+    """
+    stop = threading.Event()
+    counts = []
+
+    def reader():
+        count = 0
+        while not stop.is_set():
+            for _ in range(100):
+                read()
+            count += 100
+        counts.append(count)
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            write(i)
+            i += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+if __name__ == '__main__':
+    b1 = Borg('root', 'pass')
+    b2 = Borg('admin', 'password')
+    assert b1.login == 'admin' and b1.password == 'password'
+    snapshot = b1.snapshot()
+    b2.login = 'guest'
+    # a snapshot is never changed
+    assert snapshot.login == 'admin' and b1.login == 'guest'
+    assert b1.snapshot().version == snapshot.version + 1
+
+    # setting an attribute inside a transaction joins it
+    with b1.transaction() as changes:
+        changes['login'] = 'root'
+        b1.password = 'pass'
+        assert b1.password == 'password'
+    assert b1.snapshot().as_dict() == {'login': 'root', 'password': 'pass'}
+    try:
+        b1.version = 1
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('version is a reserved name')
+    assert b1.snapshot().version == snapshot.version + 2
+
+    def read_snapshot():
+        snapshot = b1.snapshot()
+        assert snapshot.login[4:] == snapshot.password[4:]
+
+    def read_locked():
+        login, password = locked.credentials()
+        assert login[4:] == password[4:]
+
+    locked = LockedBorg('user0', 'pass0')
+    Borg('user0', 'pass0')
+    snapshot_reads = benchmark(read_snapshot, lambda i: Borg('user{}'.format(i), 'pass{}'.format(i)))
+    locked_reads = benchmark(read_locked, lambda i: LockedBorg('user{}'.format(i), 'pass{}'.format(i)))
+    print('consistent reads in 0.5s: snapshot {}, locked {}'.format(snapshot_reads, locked_reads))
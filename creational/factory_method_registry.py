@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+In the Factory Method example every new kind of pizza needs its own OrderPizzaBase subclass, and all of them
+must be imported up front. With hundreds of kinds it slows down the startup a lot.
+
+The ProductRegistry below maps names to the product classes declared as "module:Class" strings
+(or as entry points of installed packages). A module is imported only when its product is requested
+for the first time, then the resolved class is cached and the following lookups are plain dictionary lookups.
+"""
+import importlib
+import sys
+import threading
+import time
+import timeit
+
+from creational.factory_method import OrderPizzaBase
+
+
+class ProductRegistry(object):
+    """
+    Product classes by their names.
+    """
+
+    def __init__(self):
+        # "module:Class" paths or entry points by the names
+        self._declared = {}
+        # resolved classes by the names
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._resolved or name in self._declared
+
+    def register(self, name, target):
+        """
+        Declares a product: target is either a class or a "module:Class" string which is imported on demand.
+        """
+        with self._lock:
+            self._resolved.pop(name, None)
+            if isinstance(target, str):
+                self._declared[name] = target
+            else:
+                self._resolved[name] = target
+
+    def register_entry_points(self, group):
+        """
+        Declares the products of all the installed packages from the given entry point group.
+        The entry points are not loaded until requested.
+        """
+        from importlib.metadata import entry_points
+        for entry_point in entry_points(group=group):
+            with self._lock:
+                self._declared[entry_point.name] = entry_point
+
+    def get(self, name):
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._resolved:
+                try:
+                    target = self._declared[name]
+                except KeyError:
+                    raise KeyError('Unknown product: {}'.format(name))
+                if isinstance(target, str):
+                    module_name, _, class_name = target.partition(':')
+                    self._resolved[name] = getattr(importlib.import_module(module_name), class_name)
+                else:
+                    self._resolved[name] = target.load()
+            return self._resolved[name]
+
+    def create(self, name, *args, **kwargs):
+        return self.get(name)(*args, **kwargs)
+
+
+pizzas = ProductRegistry()
+pizzas.register('rounded', 'creational.factory_method:RoundedPizza')
+pizzas.register('squared', 'creational.factory_method:SquaredPizza')
+
+
+class OrderPizzaByName(OrderPizzaBase):
+    """
+    A single factory for all the kinds of pizza: the factory method looks the pizza class up by the name.
+    """
+
+    def __init__(self, name, registry=pizzas):
+        self.name = name
+        self.registry = registry
+        super(OrderPizzaByName, self).__init__()
+
+    def create_pizza(self):
+        return self.registry.create(self.name)
+
+
+if __name__ == '__main__':
+    order = OrderPizzaByName('rounded')
+    assert str(order.pizza) == 'Rounded pizza'
+    order = OrderPizzaByName('squared')
+    assert str(order.pizza) == 'Squared pizza'
+    assert 'squared' in pizzas and 'hexagonal' not in pizzas
+
+    # a product from a module which has not been imported yet
+    sys.modules.pop('fractions', None)
+    registry = ProductRegistry()
+    registry.register('fraction', 'fractions:Fraction')
+    assert 'fractions' not in sys.modules
+    started = time.perf_counter()
+    registry.get('fraction')
+    cold = time.perf_counter() - started
+    warm = timeit.timeit(lambda: registry.get('fraction'), number=100000) / 100000
+    assert registry.create('fraction', 1, 2).denominator == 2
+    print('lookup: cold {:.1f}us, warm {:.3f}us'.format(cold * 1e6, warm * 1e6))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+The factories in the Factory Method and Abstract Factory examples build every product from scratch.
+If __init__ does a real work it is cheaper to build a product once and then copy it:
+this is the Prototype pattern. The PrototypeFactory keeps a pre-built prototype for every kind of product
+and creates new products by cloning the prototypes.
+
+The same idea works for the derived values: all the pizzas made of the same ingredients have the same description,
+so DescribedPizza computes it once per (dough, filling) combination.
+"""
+import copy
+import timeit
+
+from creational.abstract_factory import ItalianIngredientsFactory, AmericanIngredientsFactory, Pizza
+from creational.factory_method import OrderPizzaBase
+
+
+def shallow_clone(prototype):
+    """
+    A faster alternative to copy.copy for the objects with __dict__: no __reduce_ex__ protocol is involved.
+    """
+    cls = type(prototype)
+    clone = cls.__new__(cls)
+    clone.__dict__.update(prototype.__dict__)
+    return clone
+
+
+class PrototypeFactory(object):
+    """
+    Creates products by cloning the registered prototypes.
+    """
+
+    def __init__(self):
+        # (prototype, clone function) by the product names
+        self._prototypes = {}
+
+    def register(self, name, prototype, clone=copy.copy):
+        """
+        The clone function makes a new product from the prototype: copy.copy, copy.deepcopy or a custom one.
+        """
+        self._prototypes[name] = (prototype, clone)
+
+    def create(self, name):
+        prototype, clone = self._prototypes[name]
+        return clone(prototype)
+
+
+class DescribedPizza(Pizza):
+    """
+    A pizza which caches its description per combination of the ingredient types.
+    """
+
+    __slots__ = ()
+
+    _descriptions = {}
+
+    def __str__(self):
+        key = (type(self.dough), type(self.filling))
+        try:
+            return self._descriptions[key]
+        except KeyError:
+            description = self._descriptions[key] = super(DescribedPizza, self).__str__()
+            return description
+
+
+class RecipePizza(object):
+    """
+    A pizza whose __init__ does a real work: it computes the baking schedule.
+    """
+
+    def __init__(self):
+        self.schedule = [minute * minute % 7 for minute in range(1000)]
+
+    def __str__(self):
+        return 'Recipe pizza'
+
+
+class OrderRecipePizza(OrderPizzaBase):
+    def create_pizza(self):
+        return RecipePizza()
+
+
+prototypes = PrototypeFactory()
+# the schedule is never modified, so the clones may share it
+prototypes.register('recipe', RecipePizza(), shallow_clone)
+
+
+class OrderPrototypePizza(OrderPizzaBase):
+    def __init__(self, name, factory=prototypes):
+        self.name = name
+        self.factory = factory
+        super(OrderPrototypePizza, self).__init__()
+
+    def create_pizza(self):
+        return self.factory.create(self.name)
+
+
+if __name__ == '__main__':
+    order = OrderPrototypePizza('recipe')
+    assert str(order.pizza) == 'Recipe pizza'
+    assert order.pizza is not OrderPrototypePizza('recipe').pizza
+    assert order.pizza.schedule == OrderRecipePizza().pizza.schedule
+
+    factory = PrototypeFactory()
+    factory.register('italian', DescribedPizza(ItalianIngredientsFactory()))
+    factory.register('american', DescribedPizza(AmericanIngredientsFactory()))
+    pizza = factory.create('american')
+    assert str(pizza) == 'Pizza with Puff pastry and Bacon'
+    assert str(factory.create('italian')) == 'Pizza with Thin crust and Cheese'
+    # the description is computed once per combination
+    assert len(DescribedPizza._descriptions) == 2
+
+    print('10000 orders: create_pizza() {:.4f}s, prototype {:.4f}s'.format(
+        timeit.timeit(OrderRecipePizza, number=10000),
+        timeit.timeit(lambda: OrderPrototypePizza('recipe'), number=10000)))
+    plain = Pizza(AmericanIngredientsFactory())
+    print('100000 descriptions: plain {:.4f}s, cached {:.4f}s'.format(
+        timeit.timeit(lambda: str(plain), number=100000), timeit.timeit(lambda: str(pizza), number=100000)))
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+The module level singleton (approach 5 in the Singleton example) is usually created at the import time,
+so every process pays for it even if it is never used.
+A lazy singleton defers the creation, and optionally the import of the module which implements it,
+until the first attribute access:
+1. a LazySingleton proxy which creates the real instance on the first attribute access
+2. a module level __getattr__ (PEP 562) which creates the module attribute on the first access
+
+Run this module to compare the startup time of the eager and the lazy approaches in a "python -X importtime" style.
+"""
+import importlib
+import os
+import sys
+import threading
+
+
+def _resolve(target):
+    """
+    Returns an object by its "module:attribute" path, a callable is returned as is.
+    """
+    if callable(target):
+        return target
+    module_name, _, attribute = target.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class LazySingleton(object):
+    """
+    A proxy which creates the real instance on the first attribute access and delegates everything to it.
+    The factory is either a callable or a "module:attribute" string: in the latter case the module
+    is not even imported until the instance is needed.
+    """
+
+    def __init__(self, factory, *args, **kwargs):
+        # the attributes are set through the object class since the proxy delegates everything else
+        object.__setattr__(self, '_factory', (factory, args, kwargs))
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _get_instance(self):
+        instance = object.__getattribute__(self, '_instance')
+        if instance is None:
+            with object.__getattribute__(self, '_lock'):
+                instance = object.__getattribute__(self, '_instance')
+                if instance is None:
+                    factory, args, kwargs = object.__getattribute__(self, '_factory')
+                    instance = _resolve(factory)(*args, **kwargs)
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    @property
+    def created(self):
+        return object.__getattribute__(self, '_instance') is not None
+
+    def __getattr__(self, item):
+        return getattr(self._get_instance(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._get_instance(), key, value)
+
+    def __delattr__(self, item):
+        delattr(self._get_instance(), item)
+
+
+def lazy_module_attributes(module_name, **factories):
+    """
+    Returns a module level __getattr__ function which creates the given attributes on the first access.
+    The created object is stored in the module, so the following accesses are ordinary global lookups:
+
+    __getattr__ = lazy_module_attributes(__name__, db=DBConnection)
+
+    Every attribute has its own lock, so a factory may read another lazy attribute of the same module
+    and a slow factory does not hold up the creation of the other attributes.
+    """
+    locks = dict((name, threading.Lock()) for name in factories)
+
+    def __getattr__(name):
+        if name not in factories:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(module_name, name))
+        module = sys.modules[module_name]
+        with locks[name]:
+            # the attribute may have been created by another thread while we were waiting for the lock
+            if name not in module.__dict__:
+                module.__dict__[name] = _resolve(factories[name])()
+        return module.__dict__[name]
+
+    return __getattr__
+
+
+# a module which creates an "expensive" singleton at the import time
+_EAGER_MODULE = '''
+import time
+class DBConnection(object):
+    def __init__(self):
+        time.sleep(0.05)
+db = DBConnection()
+'''
+
+# the same module which defers the creation to the first access
+_LAZY_MODULE = '''
+import time
+from creational.singleton_lazy import lazy_module_attributes
+class DBConnection(object):
+    def __init__(self):
+        time.sleep(0.05)
+__getattr__ = lazy_module_attributes(__name__, db=DBConnection)
+'''
+
+
+def _import_time(directory, module_name):
+    """
+    Returns the cumulative import time of a module in microseconds as reported by "python -X importtime".
+    """
+    # imported here to keep the import of this module itself cheap
+    import subprocess
+
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join([directory, os.path.dirname(os.path.dirname(__file__))])
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module_name],
+                             env=environment, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module_name:
+            return int(parts[1])
+
+
+if __name__ == '__main__':
+    import tempfile
+    import types
+
+    created = []
+
+    class DBConnection(object):
+        def __init__(self, dsn):
+            created.append(self)
+            self.dsn = dsn
+
+    db = LazySingleton(DBConnection, 'postgres://localhost')
+    assert not db.created and not created
+    assert db.dsn == 'postgres://localhost'
+    assert db.created and len(created) == 1
+    db.dsn = 'postgres://remote'
+    assert created[0].dsn == 'postgres://remote' and len(created) == 1
+
+    # the module is imported only on the first access
+    sys.modules.pop('fractions', None)
+    half = LazySingleton('fractions:Fraction', 1, 2)
+    assert 'fractions' not in sys.modules
+    assert half.denominator == 2 and 'fractions' in sys.modules
+
+    # a lazy attribute created from another one
+    settings = sys.modules['settings'] = types.ModuleType('settings')
+    settings.__getattr__ = lazy_module_attributes(
+        'settings', config=lambda: {'size': 2}, pool=lambda: [None] * settings.config['size'])
+    assert settings.pool == [None, None] and settings.config == {'size': 2}
+    del sys.modules['settings']
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, source in (('eager_db', _EAGER_MODULE), ('lazy_db', _LAZY_MODULE)):
+            with open(os.path.join(directory, name + '.py'), 'w') as f:
+                f.write(source)
+        sys.path.insert(0, directory)
+        try:
+            import lazy_db
+            assert 'db' not in lazy_db.__dict__
+            assert lazy_db.db is lazy_db.db
+        finally:
+            sys.path.remove(directory)
+        eager = _import_time(directory, 'eager_db')
+        lazy = _import_time(directory, 'lazy_db')
+    print('import time: eager {}us, lazy {}us'.format(eager, lazy))
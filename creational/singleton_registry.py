@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+SingletonMixin in the Singleton example keeps every instance it has ever created in a class level dictionary,
+so the instances (and their classes) live until the process exits.
+It is not a problem for a few classes, but the dictionary grows without a limit for dynamically generated classes
+or in tests.
+
+The InstanceRegistry below bounds the memory in one of the two ways:
+1. weak mode: the instances are held by weak references, so an instance is dropped as soon as nobody else uses it
+2. eviction mode: the least recently used instances are evicted when there are more than maxsize of them,
+   and the instances older than ttl seconds are created again
+
+The registry also counts hits, misses and evictions and supports explicit evict(cls) and reset().
+"""
+import gc
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+
+class InstanceRegistry(object):
+    """
+    Instances by their classes.
+    """
+
+    def __init__(self, weak=False, maxsize=None, ttl=None, clock=time.monotonic):
+        if weak and (maxsize is not None or ttl is not None):
+            raise ValueError('Weak registry does not support maxsize and ttl')
+        self.weak = weak
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = 0
+        self._instances = None
+        self.reset()
+
+    def __len__(self):
+        return len(self._instances)
+
+    def get(self, cls):
+        """
+        Returns the instance of the class or None.
+        """
+        with self._lock:
+            if self.weak:
+                instance = self._instances.get(cls)
+            else:
+                instance, created = self._instances.get(cls, (None, None))
+                if instance is not None:
+                    if self.ttl is not None and self._clock() - created > self.ttl:
+                        del self._instances[cls]
+                        self.evictions += 1
+                        instance = None
+                    else:
+                        self._instances.move_to_end(cls)
+            if instance is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return instance
+
+    def set(self, cls, instance):
+        with self._lock:
+            if self.weak:
+                self._instances[cls] = instance
+                return
+            self._instances[cls] = (instance, self._clock())
+            self._instances.move_to_end(cls)
+            while self.maxsize is not None and len(self._instances) > self.maxsize:
+                self._instances.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, cls, factory):
+        """
+        Returns the instance of the class, the factory creates it if there is none.
+        """
+        with self._lock:
+            instance = self.get(cls)
+            if instance is None:
+                instance = factory()
+                self.set(cls, instance)
+            return instance
+
+    def evict(self, cls):
+        with self._lock:
+            if self._instances.pop(cls, None) is not None:
+                self.evictions += 1
+
+    def reset(self):
+        """
+        Drops all the instances and the metrics.
+        """
+        with self._lock:
+            self._instances = weakref.WeakValueDictionary() if self.weak else OrderedDict()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class EvictableSingletonMixin(object):
+    """
+    A singleton mixin which keeps the instances in an InstanceRegistry.
+    Subclasses may define their own registry with a different policy.
+    """
+
+    _registry = InstanceRegistry()
+
+    def __new__(cls, *args, **kwargs):
+        return cls._registry.get_or_create(cls, lambda: super(EvictableSingletonMixin, cls).__new__(cls))
+
+    @classmethod
+    def evict(cls):
+        cls._registry.evict(cls)
+
+
+if __name__ == '__main__':
+    class DBConnection(EvictableSingletonMixin):
+        _registry = InstanceRegistry(maxsize=2)
+
+    # dynamically generated classes
+    classes = [type('DBConnection{}'.format(i), (DBConnection,), {}) for i in range(10)]
+    instances = [cls() for cls in classes]
+    assert classes[-1]() is instances[-1]
+    assert len(DBConnection._registry) == 2
+    assert DBConnection._registry.stats() == {'size': 2, 'hits': 1, 'misses': 10, 'evictions': 8}
+    classes[-1].evict()
+    assert classes[-1]() is not instances[-1]
+    DBConnection._registry.reset()
+    assert len(DBConnection._registry) == 0
+
+    now = [0]
+
+    class Config(EvictableSingletonMixin):
+        _registry = InstanceRegistry(ttl=60, clock=lambda: now[0])
+
+    config = Config()
+    now[0] = 30
+    assert Config() is config
+    now[0] = 100
+    assert Config() is not config
+
+    class Cache(EvictableSingletonMixin):
+        _registry = InstanceRegistry(weak=True)
+
+    cache = Cache()
+    assert Cache() is cache and len(Cache._registry) == 1
+    del cache
+    gc.collect()
+    # nobody uses the instance anymore: it is dropped from the registry
+    assert len(Cache._registry) == 0
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+
+"""
+The Singleton example supports exactly one instance per class, but quite often "one" means one per some scope:
+one connection per thread, one per process or one per database (DSN).
+Below are the registries which create an instance per scope:
+1. ThreadScope: one instance per thread (threading.local)
+2. ProcessScope: one instance per process, a child created by os.fork() gets a fresh instance,
+   since sharing a socket with the parent process would corrupt it
+3. KeyedScope: one instance per key with an optional LRU limit on the number of the instances
+
+Every registry accepts a teardown callable which is called when an instance is evicted or cleared,
+ex. to close a connection.
+"""
+import gc
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+
+class ScopeBase(object):
+    """
+    A base class for all the scopes: it keeps the factory and the teardown hook.
+    """
+
+    def __init__(self, factory, teardown=None):
+        self.factory = factory
+        self.teardown = teardown
+
+    def _teardown(self, instance):
+        if self.teardown is not None:
+            self.teardown(instance)
+
+
+class _ThreadToken(object):
+    """
+    Lives only in the thread local storage: it is collected when its thread exits.
+    """
+
+
+def _release_thread_instance(scope_ref, token_id):
+    # a module level function, so the finalizer keeps neither the scope nor the token alive
+    scope = scope_ref()
+    if scope is not None:
+        scope._release(token_id)
+
+
+class ThreadScope(ScopeBase):
+    """
+    Creates one instance per thread.
+    The instances are also registered in the scope, so the instance of a thread which has exited is torn down
+    as soon as its thread local storage is collected, and clear_all() tears down the instances of all the threads.
+    """
+
+    def __init__(self, factory, teardown=None):
+        super(ThreadScope, self).__init__(factory, teardown)
+        self._local = threading.local()
+        # instances by the ids of the thread tokens
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._instances)
+
+    def get(self):
+        try:
+            return self._local.instance
+        except AttributeError:
+            # no locking needed here: nobody else can access the attributes of this thread
+            instance = self._local.instance = self.factory()
+            token = self._local.token = _ThreadToken()
+            with self._lock:
+                self._instances[id(token)] = instance
+            self._local.finalizer = weakref.finalize(token, _release_thread_instance, weakref.ref(self), id(token))
+            return instance
+
+    def _release(self, token_id):
+        with self._lock:
+            instance = self._instances.pop(token_id, None)
+        if instance is not None:
+            self._teardown(instance)
+
+    def clear(self):
+        """
+        Tears down the instance of the current thread if any.
+        """
+        local = self._local.__dict__
+        if 'instance' in local:
+            local.pop('finalizer').detach()
+            self._release(id(local.pop('token')))
+            del local['instance']
+
+    def clear_all(self):
+        """
+        Tears down the instances of all the threads. A thread gets a new instance on its next get().
+        """
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+        # the other threads still keep the instances in their local storage: a new local drops all of them
+        self._local = threading.local()
+        for instance in instances:
+            self._teardown(instance)
+
+
+class ProcessScope(ScopeBase):
+    """
+    Creates one instance per process. The instance inherited by a forked child is dropped without a teardown:
+    it belongs to the parent process.
+    """
+
+    def __init__(self, factory, teardown=None):
+        super(ProcessScope, self).__init__(factory, teardown)
+        self._instance = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            # a weak reference lets the scope be garbage collected: the hooks can't be unregistered
+            scope = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: scope() is not None and scope()._after_fork())
+            self._pid = None
+        else:
+            self._pid = os.getpid()
+
+    def _after_fork(self):
+        self._instance = None
+        # the lock may have been held by another thread of the parent at the moment of fork
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._pid is not None and self._pid != os.getpid():
+            # no fork hooks on this platform: detect the fork by the process id
+            self._after_fork()
+            self._pid = os.getpid()
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self.factory()
+        return self._instance
+
+    def clear(self):
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None:
+            self._teardown(instance)
+
+
+class KeyedScope(ScopeBase):
+    """
+    Creates one instance per key: the key is passed to the factory.
+    If maxsize is given the least recently used instances are evicted to keep at most maxsize instances.
+    The factory is called without holding the scope lock: a slow creation for one key holds up only
+    the other callers of the same key, and the factory may get instances of other keys from the scope.
+    """
+
+    def __init__(self, factory, maxsize=None, teardown=None):
+        super(KeyedScope, self).__init__(factory, teardown)
+        self.maxsize = maxsize
+        self._instances = OrderedDict()
+        self._lock = threading.Lock()
+        # locks of the keys whose instances are being created
+        self._creating = {}
+
+    def __len__(self):
+        return len(self._instances)
+
+    def _cached(self, key):
+        # must be called with self._lock held
+        instance = self._instances.get(key)
+        if instance is not None:
+            self._instances.move_to_end(key)
+        return instance
+
+    def get(self, key):
+        with self._lock:
+            instance = self._cached(key)
+            if instance is not None:
+                return instance
+            key_lock = self._creating.setdefault(key, threading.Lock())
+        evicted = []
+        with key_lock:
+            try:
+                with self._lock:
+                    # the instance may have been created by another thread while we were waiting for the key lock
+                    instance = self._cached(key)
+                if instance is not None:
+                    return instance
+                # creation may be slow (ex. opening a connection): do it outside of the scope lock
+                instance = self.factory(key)
+                with self._lock:
+                    self._instances[key] = instance
+                    while self.maxsize is not None and len(self._instances) > self.maxsize:
+                        evicted.append(self._instances.popitem(last=False)[1])
+            finally:
+                with self._lock:
+                    if self._creating.get(key) is key_lock:
+                        del self._creating[key]
+        # teardown may be slow (ex. closing a connection) as well
+        for old_instance in evicted:
+            self._teardown(old_instance)
+        return instance
+
+    def evict(self, key):
+        with self._lock:
+            instance = self._instances.pop(key, None)
+        if instance is not None:
+            self._teardown(instance)
+
+    def clear(self):
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+        for instance in instances:
+            self._teardown(instance)
+
+
+if __name__ == '__main__':
+    class DBConnection(object):
+        def __init__(self, dsn='default'):
+            self.dsn = dsn
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    per_thread = ThreadScope(DBConnection, teardown=DBConnection.close)
+    main_connection = per_thread.get()
+    assert per_thread.get() is main_connection
+    other_connections = []
+    thread = threading.Thread(target=lambda: other_connections.append(per_thread.get()))
+    thread.start()
+    thread.join()
+    assert other_connections[0] is not main_connection
+    # the instance of the exited thread is torn down as well
+    del thread
+    gc.collect()
+    assert other_connections[0].closed and len(per_thread) == 1
+    per_thread.clear()
+    assert main_connection.closed and per_thread.get() is not main_connection
+    per_thread.clear_all()
+    assert len(per_thread) == 0
+
+    per_dsn = KeyedScope(DBConnection, maxsize=2, teardown=DBConnection.close)
+    first = per_dsn.get('postgres://first')
+    second = per_dsn.get('postgres://second')
+    assert per_dsn.get('postgres://first') is first
+    # the second connection is the least recently used one
+    third = per_dsn.get('postgres://third')
+    assert second.closed and not first.closed and len(per_dsn) == 2
+    per_dsn.evict('postgres://first')
+    assert first.closed and len(per_dsn) == 1
+    per_dsn.clear()
+    assert third.closed and len(per_dsn) == 0
+
+    # a slow connect holds up only its own key, and the factory may use the scope itself
+    connected = threading.Event()
+    created = []
+
+    def connect(dsn):
+        created.append(dsn)
+        if dsn == 'postgres://slow':
+            connected.wait()
+        elif dsn == 'postgres://replica':
+            per_dsn.get('postgres://primary')
+        return DBConnection(dsn)
+
+    per_dsn = KeyedScope(connect)
+    slow = [threading.Thread(target=per_dsn.get, args=('postgres://slow',)) for _ in range(3)]
+    for thread in slow:
+        thread.start()
+    assert per_dsn.get('postgres://replica').dsn == 'postgres://replica' and len(per_dsn) == 2
+    connected.set()
+    for thread in slow:
+        thread.join()
+    assert created.count('postgres://slow') == 1 and len(per_dsn) == 3
+
+    per_process = ProcessScope(DBConnection, teardown=DBConnection.close)
+    parent_connection = per_process.get()
+    assert per_process.get() is parent_connection
+    if hasattr(os, 'fork'):
+        pid = os.fork()
+        if pid == 0:
+            # exit code 0 if the child has got its own connection
+            os._exit(0 if per_process.get() is not parent_connection else 1)
+        assert os.waitpid(pid, 0)[1] == 0
+        assert per_process.get() is parent_connection and not parent_connection.closed
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+None of the singletons in the Singleton example are thread-safe: they check whether an instance exists and then
+create it, so two threads may both see no instance and create two of them.
+Below are the thread-safe versions of all the five approaches. They use double-checked locking:
+the instance is checked without a lock first, and only if it is absent the lock is acquired and the instance
+is checked once again before creating it. After the initialization the read path never takes the lock.
+
+The instance is published (assigned) only when it is fully created, so a thread taking the fast path can't see
+a half-initialized instance.
+"""
+import threading
+import time
+import timeit
+
+from creational.singleton import DBConnection
+
+
+class ThreadSafeDBConnectionSingleton(DBConnection):
+    """
+    The first option: overwrite the __new__ method. __init__ is still called each time a singleton is requested.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            with cls._lock:
+                # another thread may have created the instance while we were waiting for the lock
+                if cls._instance is None:
+                    cls._instance = super(ThreadSafeDBConnectionSingleton, cls).__new__(cls)
+        return cls._instance
+
+
+class ThreadSafeSingletonMixin(object):
+    """
+    A reusable thread-safe singleton mixin
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        instance = cls._instances.get(cls)
+        if instance is None:
+            with cls._lock:
+                instance = cls._instances.get(cls)
+                if instance is None:
+                    instance = cls._instances[cls] = super(ThreadSafeSingletonMixin, cls).__new__(cls)
+        return instance
+
+
+class DBConnectionMixedThreadSafe(DBConnection, ThreadSafeSingletonMixin):
+    pass
+
+
+def thread_safe_singleton(class_):
+    """
+    Thread-safe singleton class decorator
+    """
+
+    class SingletonWrapper(class_):
+        _instance = None
+        _lock = threading.Lock()
+
+        def __new__(cls, *args, **kwargs):
+            if cls._instance is None:
+                with cls._lock:
+                    if cls._instance is None:
+                        cls._instance = super(SingletonWrapper, cls).__new__(cls)
+            return cls._instance
+
+    return SingletonWrapper
+
+
+@thread_safe_singleton
+class DBConnectionDecoratedThreadSafe(DBConnection):
+    pass
+
+
+class ThreadSafeSingletonMeta(type):
+    """
+    A thread-safe singleton meta class. Unlike the other approaches __init__ is called under the lock too,
+    so the instance is published only when it is completely initialized.
+    """
+
+    def __init__(self, what, bases, attrs):
+        super(ThreadSafeSingletonMeta, self).__init__(what, bases, attrs)
+        self._instance = None
+        # every class has its own lock so creating one singleton may create another one in its __init__
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = super(ThreadSafeSingletonMeta, self).__call__(*args, **kwargs)
+        return self._instance
+
+
+class DBConnectionFancyThreadSafe(DBConnection, metaclass=ThreadSafeSingletonMeta):
+    pass
+
+
+_db_connection = None
+_db_connection_lock = threading.Lock()
+
+
+def get_db_connection():
+    """
+    The module level approach: the instance is created on the first call instead of the import time.
+    """
+    global _db_connection
+    if _db_connection is None:
+        with _db_connection_lock:
+            if _db_connection is None:
+                _db_connection = DBConnection()
+    return _db_connection
+
+
+def run_in_threads(func, threads=8):
+    """
+    Runs the function in several threads started at the same moment and returns the elapsed time.
+    """
+    barrier = threading.Barrier(threads + 1)
+
+    def target():
+        barrier.wait()
+        func()
+
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    created = []
+
+    class SlowDBConnection(DBConnection, metaclass=ThreadSafeSingletonMeta):
+        def __init__(self):
+            # a slow initialization gives the other threads a chance to get through the first check
+            time.sleep(0.01)
+            created.append(self)
+
+    instances = []
+    run_in_threads(lambda: instances.append(SlowDBConnection()))
+    assert len(created) == 1 and all(instance is created[0] for instance in instances)
+
+    approaches = [
+        ('__new__', ThreadSafeDBConnectionSingleton),
+        ('mixin', DBConnectionMixedThreadSafe),
+        ('decorator', DBConnectionDecoratedThreadSafe),
+        ('metaclass', DBConnectionFancyThreadSafe),
+        ('module', get_db_connection),
+    ]
+    for name, factory in approaches:
+        assert factory() is factory()
+        # steady state: the instance already exists, every thread requests it many times
+        elapsed = run_in_threads(lambda: timeit.timeit(factory, number=100000))
+        print('{:>10}: {:.4f}s for 8 threads x 100000 accesses'.format(name, elapsed))
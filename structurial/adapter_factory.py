@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+TurkeyAdapter in the Adapter example delegates the missing attributes with __getattr__: every call of move()
+first fails the normal attribute lookup and only then looks the attribute up in the turkey.
+
+make_adapter() below looks at the adaptee class only once and generates an adapter class with an explicit
+forwarding method for every public method of the adaptee. The renamed methods (ex. quack -> gobble) are declared
+up front, so calling any method of the adapter is an ordinary method call without __getattr__.
+The other public class attributes of the adaptee (ex. properties) get forwarding properties, and only the names
+unknown at the generation time (ex. the instance attributes of the adaptee) fall back to __getattr__.
+"""
+import keyword
+from operator import attrgetter
+import timeit
+
+from structurial.adapter import Duck, Turkey, TurkeyAdapter, TurkeyClassAdapter
+
+
+def _check_name(name):
+    # the names are put into the generated source
+    if not name.isidentifier() or keyword.iskeyword(name):
+        raise ValueError('Not a valid attribute name: {!r}'.format(name))
+
+
+def _forward(adapter_name, adaptee_name):
+    # the method is compiled from the source to call the adaptee method directly, without getattr()
+    _check_name(adapter_name)
+    _check_name(adaptee_name)
+    namespace = {}
+    exec('def {}(self, *args, **kwargs):\n    return self.adaptee.{}(*args, **kwargs)\n'.format(
+        adapter_name, adaptee_name), namespace)
+    return namespace[adapter_name]
+
+
+def make_adapter(adaptee_cls, mapping=None, name=None):
+    """
+    Generates an object adapter class for the adaptee class.
+    The mapping defines the adapter methods which call the adaptee methods with different names,
+    all the other public attributes of the adaptee are forwarded as is.
+    """
+    mapping = dict(mapping or {})
+    properties = []
+    for attribute in dir(adaptee_cls):
+        if not attribute.startswith('_') and attribute not in mapping:
+            if callable(getattr(adaptee_cls, attribute)):
+                mapping[attribute] = attribute
+            else:
+                properties.append(attribute)
+
+    attributes = {'__slots__': ('adaptee',)}
+    for adapter_name, adaptee_name in mapping.items():
+        attributes[adapter_name] = _forward(adapter_name, adaptee_name)
+    for attribute in properties:
+        attributes[attribute] = property(attrgetter('adaptee.' + attribute))
+
+    def __init__(self, adaptee):
+        self.adaptee = adaptee
+
+    def __getattr__(self, item):
+        if item == 'adaptee':
+            # not set yet: there is nothing to forward to
+            raise AttributeError(item)
+        return getattr(self.adaptee, item)
+
+    attributes['__init__'] = __init__
+    attributes['__getattr__'] = __getattr__
+    return type(name or adaptee_cls.__name__ + 'Adapter', (object,), attributes)
+
+
+GeneratedTurkeyAdapter = make_adapter(Turkey, {'quack': 'gobble'}, 'GeneratedTurkeyAdapter')
+
+
+if __name__ == '__main__':
+    turkey_adapted = GeneratedTurkeyAdapter(Turkey())
+    assert turkey_adapted.quack() == 'gobble!'
+    assert turkey_adapted.move() == 'turkey is walking'
+    # the adapter provides the whole Duck interface
+    assert all(hasattr(turkey_adapted, attribute) for attribute in ('quack', 'move'))
+    assert 'move' in vars(GeneratedTurkeyAdapter)
+
+    class HeavyTurkey(Turkey):
+        @property
+        def size(self):
+            return 'large'
+
+        def __init__(self):
+            self.weight = 10
+
+    heavy = make_adapter(HeavyTurkey, {'quack': 'gobble'})(HeavyTurkey())
+    # a property and an instance attribute of the adaptee
+    assert heavy.size == 'large' and heavy.weight == 10 and heavy.quack() == 'gobble!'
+    try:
+        make_adapter(Turkey, {'quack': 'gobble(); import os'})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('Not a method name')
+
+    for title, adapter in (('__getattr__', TurkeyAdapter(Turkey())), ('generated', turkey_adapted),
+                           ('class adapter', TurkeyClassAdapter()), ('duck itself', Duck())):
+        # the method is looked up on every call, just like in a real client code
+        elapsed = timeit.timeit(lambda: adapter.move(), number=1000000)
+        print('{:>13}: {:.4f}s per 1000000 move() calls'.format(title, elapsed))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+Adapting a huge stream of turkeys with TurkeyAdapter creates one adapter object per turkey
+and a list of adapters keeps all of them in memory.
+
+StreamAdapter below adapts a stream lazily with generators, so the memory use does not depend on the stream length:
+1. adapt() yields an adapter per item, one at a time
+2. call() is the column-wise mode: it calls the adapted method (ex. quack -> gobble) directly on a batch of items
+   and yields the batches of results without creating any adapters at all
+"""
+from itertools import islice
+from operator import methodcaller
+import timeit
+import tracemalloc
+
+from structurial.adapter import Turkey, TurkeyAdapter
+
+
+class StreamAdapter(object):
+    """
+    Adapts the streams of adaptees: the mapping defines the adapted method names (ex. {'quack': 'gobble'}),
+    the other methods are called as is.
+    """
+
+    def __init__(self, adapter_cls, mapping=None):
+        self.adapter_cls = adapter_cls
+        self.mapping = mapping or {}
+
+    def adapt(self, iterable):
+        adapter_cls = self.adapter_cls
+        for item in iterable:
+            yield adapter_cls(item)
+
+    def call(self, iterable, method, *args, batch_size=1024, **kwargs):
+        """
+        Yields the lists of results of calling the method on every item, batch_size items at a time.
+        """
+        caller = methodcaller(self.mapping.get(method, method), *args, **kwargs)
+        iterator = iter(iterable)
+        while True:
+            batch = list(map(caller, islice(iterator, batch_size)))
+            if not batch:
+                return
+            yield batch
+
+    def call_flat(self, iterable, method, *args, batch_size=1024, **kwargs):
+        """
+        Yields the results one by one.
+        """
+        for batch in self.call(iterable, method, *args, batch_size=batch_size, **kwargs):
+            for result in batch:
+                yield result
+
+
+def turkeys(count):
+    for _ in range(count):
+        yield Turkey()
+
+
+def _peak_memory(consume):
+    tracemalloc.start()
+    try:
+        consume()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    stream = StreamAdapter(TurkeyAdapter, {'quack': 'gobble'})
+    assert [adapter.quack() for adapter in stream.adapt(turkeys(3))] == ['gobble!'] * 3
+    assert list(stream.call(turkeys(5), 'quack', batch_size=2)) == [['gobble!'] * 2, ['gobble!'] * 2, ['gobble!']]
+    assert list(stream.call_flat(turkeys(3), 'move')) == ['turkey is walking'] * 3
+    # the positional arguments go to the method, batch_size is keyword-only
+    assert list(stream.call_flat(['a-b', 'c-d'], 'split', '-', batch_size=1)) == [['a', 'b'], ['c', 'd']]
+
+    for count in (10000, 100000):
+        print('{} turkeys, peak memory: list of adapters {}, streamed {} bytes'.format(
+            count, _peak_memory(lambda: [adapter.quack() for adapter in [TurkeyAdapter(t) for t in turkeys(count)]]),
+            _peak_memory(lambda: sum(len(batch) for batch in stream.call(turkeys(count), 'quack')))))
+    print('100000 turkeys: adapter per item {:.4f}s, column-wise {:.4f}s'.format(
+        timeit.timeit(lambda: [adapter.quack() for adapter in stream.adapt(turkeys(100000))], number=1),
+        timeit.timeit(lambda: list(stream.call_flat(turkeys(100000), 'quack')), number=1)))
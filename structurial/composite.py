@@ -5,6 +5,9 @@ The Composition pattern allows you to compose objects into tree structures to re
 Composite lets clients treat individual objects and compositions of objects uniformly.
 """
 from abc import ABCMeta, abstractmethod
+from collections import deque
+import sys
+import timeit
 
 
 class Component(object):
@@ -14,19 +17,123 @@ class Component(object):
     """
     __metaclass__ = ABCMeta
 
+    # a cheap way to tell a leaf without trying to iterate over it
+    is_leaf = False
+
+    # functions computing the subtree aggregates by their names, see register_aggregate(): one global registry
+    _aggregate_functions = {}
+
+    # an optional index of the tree this node belongs to (see composite_index.py)
+    index = None
+
     def __init__(self, name):
         self.name = name
-        self.children = set()
+        self.parent = None
+        # a dict is used as an ordered set: the children are iterated in the order they were added
+        self.children = {}
+        # cached (function, value) pairs of the aggregates of this subtree by their names
+        self._aggregates = {}
 
     def add_child(self, child):
-        self.children.add(child)
+        if self.index is not None:
+            # raises ValueError before anything is changed if a path would be taken twice
+            entries = self.index.check_subtree(child, self)
+        if child.parent is not None:
+            child.parent.remove_child(child)
+        elif child.index is not None:
+            # the root of another indexed tree
+            child.index.remove_subtree(child)
+        self.children[child] = None
+        child.parent = self
+        self.invalidate()
+        if self.index is not None:
+            self.index.add_subtree(child, entries)
 
     def remove_child(self, child):
-        self.children.remove(child)
+        if child not in self.children:
+            raise KeyError(child)
+        # the index is updated while the child is still linked
+        if self.index is not None:
+            self.index.remove_subtree(child)
+        del self.children[child]
+        child.parent = None
+        self.invalidate()
+
+    @classmethod
+    def register_aggregate(cls, name, compute):
+        """
+        Registers a subtree aggregate: compute(node, values) returns the aggregate of the node
+        given the list of the aggregates of its children.
+        The registry is global: an aggregate registered on any subclass is available on all the nodes.
+        Registering a name again replaces the function and the values cached with the old one are not used anymore.
+        """
+        Component._aggregate_functions[name] = compute
+
+    def aggregate(self, name):
+        """
+        Returns the aggregate of this subtree. The aggregates are cached, so only the changed subtrees are computed.
+        """
+        compute = self._aggregate_functions[name]
+
+        def cached(node):
+            # a value computed by a replaced function is stale
+            entry = node._aggregates.get(name)
+            return entry is not None and entry[0] is compute
+
+        # the cached subtrees are pruned: their aggregates are already known
+        if not cached(self):
+            for node in self.walk('post', prune=cached):
+                if not cached(node):
+                    node._aggregates[name] = (compute, compute(
+                        node, [child._aggregates[name][1] for child in node.children]))
+        return self._aggregates[name][1]
+
+    def invalidate(self):
+        """
+        Drops the cached aggregates of this node and its ancestors.
+        A node can be cached only if all its descendants are cached, so the first node without a cache stops it.
+        """
+        node = self
+        while node is not None and node._aggregates:
+            node._aggregates = {}
+            node = node.parent
 
     def __iter__(self):
         return iter(self.children)
 
+    def walk(self, order='pre', prune=None):
+        """
+        Iterates over the subtree of this node without recursion, so the depth of a tree is not limited.
+        The order is 'pre' (depth-first, a node before its children), 'post' (depth-first, a node after its children)
+        or 'breadth' (breadth-first). If prune(node) returns True the children of the node are skipped.
+        """
+        if order == 'pre':
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                yield node
+                if not node.is_leaf and not (prune is not None and prune(node)):
+                    # reversed, so the first child is popped first
+                    stack.extend(reversed(list(node.children)))
+        elif order == 'post':
+            stack = [(self, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if expanded or node.is_leaf or (prune is not None and prune(node)):
+                    yield node
+                else:
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in reversed(list(node.children)))
+        elif order == 'breadth':
+            queue = deque([self])
+            while queue:
+                node = queue.popleft()
+                yield node
+                if not node.is_leaf and not (prune is not None and prune(node)):
+                    queue.extend(node.children)
+        else:
+            raise ValueError('Unknown order: {}'.format(order))
+
     @abstractmethod
     def say(self):
         """
@@ -49,6 +156,8 @@ class Leaf(Component):
     This is a leaf node in a tree and it can't have any children.
     """
 
+    is_leaf = True
+
     def add_child(self, child):
         raise NotImplementedError('Leaf node can not have children')
 
@@ -82,5 +191,61 @@ if __name__ == '__main__':
             pass
 
     traverse(root)
-    assert '\n'.join(result) == 'I am a composite node root\nI am a leaf node b\nI am a composite node c\nI am a leaf node d\nI am a leaf node e\nI am a leaf node a'
+    assert '\n'.join(result) == 'I am a composite node root\nI am a leaf node a\nI am a leaf node b\nI am a composite node c\nI am a leaf node d\nI am a leaf node e'
+
+    # the same without recursion and exceptions
+    assert [node.say() for node in root.walk()] == result
+    assert [node.name for node in root.walk('post')] == ['a', 'b', 'd', 'e', 'c', 'root']
+    assert [node.name for node in root.walk('breadth')] == ['root', 'a', 'b', 'c', 'd', 'e']
+    assert [node.name for node in root.walk(prune=lambda node: node.name == 'c')] == ['root', 'a', 'b', 'c']
+
+    Component.register_aggregate('count', lambda node, values: 1 + sum(values))
+    Component.register_aggregate('say', lambda node, values: '\n'.join([node.say()] + values))
+    assert root.aggregate('count') == 6 and c.aggregate('count') == 3
+    assert root.aggregate('say') == '\n'.join(result)
+    # only the path from the changed node to the root is invalidated
+    c.add_child(Leaf('f'))
+    assert not root._aggregates and not c._aggregates and len(root.children) == 3
+    assert root.aggregate('count') == 7
+    c.remove_child(next(iter(c.children)))
+    assert root.aggregate('count') == 6
+    # the values cached with a replaced function are recomputed
+    Component.register_aggregate('leaves', lambda node, values: sum(values))
+    assert root.aggregate('leaves') == 0
+    Leaf.register_aggregate('leaves', lambda node, values: int(node.is_leaf) + sum(values))
+    assert root.aggregate('leaves') == 4 and c.aggregate('leaves') == 2
+
+    # a tree deeper than the recursion limit
+    deep = node = Composite('0')
+    for i in range(sys.getrecursionlimit() * 2):
+        child = Composite(str(i + 1))
+        node.add_child(child)
+        node = child
+    assert sum(1 for _ in deep.walk()) == sys.getrecursionlimit() * 2 + 1
+
+    wide = Composite('wide')
+    for i in range(100):
+        child = Composite(str(i))
+        for j in range(100):
+            child.add_child(Leaf(str(j)))
+        wide.add_child(child)
+
+    def recursive():
+        del result[:]
+        traverse(wide)
+
+    print('10101 nodes: recursive try/except {:.4f}s, walk() {:.4f}s per 10 traversals'.format(
+        timeit.timeit(recursive, number=10), timeit.timeit(lambda: [node.say() for node in wide.walk()], number=10)))
+
+    leaf = next(iter(next(iter(wide.children)).children))
+
+    def update():
+        # an update invalidates only the ancestors of the changed node
+        leaf.parent.add_child(Leaf('new'))
+        return wide.aggregate('count')
+
+    wide.aggregate('count')
+    print('count of 10101 nodes: walk() {:.4f}s, cached {:.4f}s, update + aggregate {:.4f}s per 10 queries'.format(
+        timeit.timeit(lambda: sum(1 for _ in wide.walk()), number=10),
+        timeit.timeit(lambda: wide.aggregate('count'), number=10), timeit.timeit(update, number=10)))
 
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+"""
+Looking a node up by its name in a Composite tree means a traversal of the whole tree.
+TreeIndex maps the names and the root-to-node paths ("root/c/d") to the nodes.
+Once an index is attached to a tree, add_child() and remove_child() keep it up to date.
+The siblings must have different names, so the paths are unique: a node whose path is already taken
+is rejected with ValueError before anything is changed. Renaming a node is not tracked.
+
+Large trees are better built by bulk_load() from a flat list of (parent, name, kind) rows: it links the nodes
+directly and indexes the whole tree in a single pass instead of checking and updating the index on every add_child().
+Most of the time of building a large tree goes to the cyclic garbage collector: it traverses all the young
+nodes again and again although none of them is garbage (a parent and its children refer to each other).
+bulk_load() pauses the collector while the tree is built.
+"""
+import gc
+import timeit
+
+from structurial.composite import Composite, Leaf
+
+SEPARATOR = '/'
+
+
+class TreeIndex(object):
+    """
+    An index of the tree: nodes by their names and paths.
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        # nodes by the paths
+        self._nodes = {}
+        # paths by the nodes
+        self._paths = {}
+        # nodes by the names: a dict is used as an ordered set
+        self._names = {}
+        if root is not None:
+            self.add_subtree(root)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def check_subtree(self, node, parent):
+        """
+        Returns the (node, path) pairs of the node and all its descendants as if the node was a child of the parent
+        (None for the root). Raises ValueError if a path is already taken by another node.
+        """
+        subtree = list(node.walk())
+        members = set(subtree)
+        paths = {}
+        taken = set()
+        for descendant in subtree:
+            if descendant is node:
+                path = node.name if parent is None else self._paths[parent] + SEPARATOR + node.name
+            else:
+                path = paths[descendant.parent] + SEPARATOR + descendant.name
+            existing = self._nodes.get(path)
+            if path in taken or (existing is not None and existing not in members):
+                raise ValueError('Duplicate node path: {}'.format(path))
+            taken.add(path)
+            paths[descendant] = path
+        return list(paths.items())
+
+    def add_subtree(self, node, entries=None):
+        """
+        Indexes the node and all its descendants. entries are the pairs returned by check_subtree() if already known.
+        """
+        if entries is None:
+            # all the paths are checked before the index is changed
+            entries = self.check_subtree(node, None if node is self.root else node.parent)
+        for descendant, path in entries:
+            descendant.index = self
+            self._paths[descendant] = path
+            self._nodes[path] = descendant
+            self._names.setdefault(descendant.name, {})[descendant] = None
+
+    def remove_subtree(self, node):
+        if node is self.root:
+            self.root = None
+        for descendant in node.walk():
+            descendant.index = None
+            del self._nodes[self._paths.pop(descendant)]
+            nodes = self._names[descendant.name]
+            del nodes[descendant]
+            if not nodes:
+                del self._names[descendant.name]
+
+    def by_name(self, name):
+        return list(self._names.get(name, ()))
+
+    def by_path(self, path):
+        return self._nodes.get(path)
+
+    def path(self, node):
+        return self._paths[node]
+
+    def with_prefix(self, path):
+        """
+        Yields the (path, node) pairs of the node with the given path and all its descendants.
+        """
+        node = self._nodes.get(path)
+        if node is not None:
+            for descendant in node.walk():
+                yield self._paths[descendant], descendant
+
+
+def bulk_load(rows, kinds=None):
+    """
+    Builds an indexed tree from (parent name, name, kind) rows, every parent must precede its children
+    and the root has no parent (None). The names must be unique. Returns the TreeIndex of the tree.
+    """
+    kinds = kinds or {'composite': Composite, 'leaf': Leaf}
+    enabled = gc.isenabled()
+    # every node created here stays reachable from the root, so a collection in the middle only wastes time
+    gc.disable()
+    try:
+        return _load(rows, kinds)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _load(rows, kinds):
+    index = TreeIndex()
+    nodes, paths, names = index._nodes, index._paths, index._names
+    # (node, path prefix of its children) by the names
+    parents = {}
+    for parent_name, name, kind in rows:
+        if name in parents:
+            raise ValueError('Duplicate node name: {}'.format(name))
+        node = kinds[kind](name)
+        node.index = index
+        if parent_name is None:
+            if index.root is not None:
+                raise ValueError('Second root node: {}'.format(name))
+            index.root = node
+            path = name
+        else:
+            parent, prefix = parents[parent_name]
+            if parent.is_leaf:
+                raise ValueError('Leaf node can not have children: {}'.format(parent_name))
+            # the children are linked directly: no invalidation and no index updates for every node
+            parent.children[node] = None
+            node.parent = parent
+            path = prefix + name
+        parents[name] = (node, path + SEPARATOR)
+        paths[node] = path
+        nodes[path] = node
+        names[name] = {node: None}
+    if index.root is None:
+        raise ValueError('No root node')
+    return index
+
+
+if __name__ == '__main__':
+    root = Composite('root')
+    root.add_child(Leaf('a'))
+    c = Composite('c')
+    c.add_child(Leaf('d'))
+    root.add_child(c)
+    index = TreeIndex(root)
+    assert index.by_path('root/c/d').name == 'd'
+    assert index.by_name('c') == [c]
+
+    # the index is kept up to date
+    c.add_child(Leaf('e'))
+    assert index.path(index.by_name('e')[0]) == 'root/c/e'
+    assert [path for path, _ in index.with_prefix('root/c')] == ['root/c', 'root/c/d', 'root/c/e']
+    root.remove_child(c)
+    assert index.by_path('root/c/e') is None and index.by_name('d') == [] and len(index) == 2
+    assert c.index is None
+    # removing a node which is not a child leaves the index intact
+    try:
+        root.remove_child(c)
+    except KeyError:
+        pass
+    assert len(index) == 2
+    # a sibling with the same name is rejected and nothing is changed
+    try:
+        root.add_child(Leaf('a'))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('The path root/a is taken')
+    assert len(root.children) == 1 and len(index) == 2
+
+    # the root of another indexed tree is moved into this one
+    other = Composite('other')
+    other.add_child(Leaf('f'))
+    other_index = TreeIndex(other)
+    root.add_child(other)
+    assert len(other_index) == 0 and other_index.root is None
+    assert index.by_path('root/other/f').name == 'f' and len(index) == 4
+
+    rows = [(None, 'root', 'composite')]
+    for i in range(300):
+        rows.append(('root', 'c{}'.format(i), 'composite'))
+        rows.extend(('c{}'.format(i), 'l{}-{}'.format(i, j), 'leaf') for j in range(300))
+    index = bulk_load(rows)
+    assert len(index) == len(rows) and index.by_path('root/c5/l5-7').name == 'l5-7'
+
+    def add_children():
+        nodes = {}
+        kinds = {'composite': Composite, 'leaf': Leaf}
+        root = nodes['root'] = Composite('root')
+        TreeIndex(root)
+        for parent_name, name, kind in rows[1:]:
+            node = nodes[name] = kinds[kind](name)
+            nodes[parent_name].add_child(node)
+
+    try:
+        bulk_load([(None, 'root', 'composite'), (None, 'other', 'composite')])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('A tree has one root')
+
+    # timeit turns the garbage collector off by default, here it is on as in the real code
+    setup = 'gc.collect(); gc.enable()'
+    add_time = min(timeit.repeat(add_children, setup, number=1, repeat=5, globals={'gc': gc}))
+    bulk_time = min(timeit.repeat(lambda: bulk_load(rows), setup, number=1, repeat=5, globals={'gc': gc}))
+    print('{} nodes: add_child() {:.4f}s, bulk_load() {:.4f}s, {:.2f}x'.format(
+        len(rows), add_time, bulk_time, add_time / bulk_time))
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+A proxy may control not only the access to the subject, but also how often the subject is actually called.
+CachingProxy memoizes the results of the chosen methods of any subject by the call arguments:
+- the cache is limited by maxsize (None for no limit), the least recently used results are evicted first
+- every method may have its own TTL (time to live) in seconds
+- the cached results may be invalidated explicitly: a call which has started before the invalidation
+  does not store its (possibly stale) result
+- concurrent identical calls are de-duplicated ("single-flight"): only one of them calls the subject,
+  the others wait for its result
+- the proxy counts hits, misses, evictions and de-duplicated calls
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from structurial.proxy import Dog
+
+
+class _Flight(object):
+    """
+    A call of the subject in progress: the concurrent identical calls wait for it.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class CachingProxy(object):
+    """
+    methods is a dictionary of the cached method names and their TTLs (None for no expiration).
+    Arguments of the cached methods must be hashable.
+    """
+
+    def __init__(self, subject, methods, maxsize=1024, clock=time.monotonic):
+        self._subject = subject
+        self._methods = dict(methods)
+        self._maxsize = maxsize
+        self._clock = clock
+        # (value, expiration time) by (method, args, kwargs)
+        self._cache = OrderedDict()
+        # the calls in progress by the cache keys: invalidate() drops them, so their results are not cached
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.deduplicated = 0
+
+    def __getattr__(self, item):
+        if item not in self._methods:
+            return getattr(self._subject, item)
+
+        def cached(*args, **kwargs):
+            return self._call(item, args, kwargs)
+
+        # the wrapper is stored in the instance, so __getattr__ is called only once per method
+        self.__dict__[item] = cached
+        return cached
+
+    def _call(self, method, args, kwargs):
+        key = (method, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > self._clock():
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._cache[key]
+                self.evictions += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        done = False
+        try:
+            flight.value = getattr(self._subject, method)(*args, **kwargs)
+            done = True
+        except Exception as error:
+            # errors are not cached, but the waiting calls get the same error
+            flight.error = error
+            done = True
+            raise
+        else:
+            ttl = self._methods[method]
+            with self._lock:
+                # the result is stale if the key has been invalidated while the subject was called
+                if self._flights.get(key) is flight:
+                    self._cache[key] = (flight.value, None if ttl is None else self._clock() + ttl)
+                    while self._maxsize is not None and len(self._cache) > self._maxsize:
+                        self._cache.popitem(last=False)
+                        self.evictions += 1
+            return flight.value
+        finally:
+            if not done:
+                # ex. KeyboardInterrupt in the leading call: the waiting calls must not return None
+                flight.error = RuntimeError('The call of {} has been interrupted'.format(method))
+            with self._lock:
+                # the flight may have been dropped by invalidate() and replaced by a newer one
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.event.set()
+
+    def invalidate(self, method=None, *args, **kwargs):
+        """
+        Drops the cached results: all of them, all of a method or the one of a method called with given arguments.
+        The calls in progress are not joined by the new calls and do not cache their results.
+        """
+        with self._lock:
+            if method is None:
+                self._cache.clear()
+                self._flights.clear()
+            elif args or kwargs:
+                key = (method, args, tuple(sorted(kwargs.items())))
+                self._cache.pop(key, None)
+                self._flights.pop(key, None)
+            else:
+                for entries in (self._cache, self._flights):
+                    for key in [key for key in entries if key[0] == method]:
+                        del entries[key]
+
+    def stats(self):
+        return {'size': len(self._cache), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'deduplicated': self.deduplicated}
+
+
+if __name__ == '__main__':
+    class FetchingDog(Dog):
+        def __init__(self):
+            self.fetched = []
+
+        def fetch(self, thing, times=1):
+            # an expensive call
+            time.sleep(0.05)
+            self.fetched.append(thing)
+            return '{} x{}'.format(thing, times)
+
+    now = [0]
+    fetching_dog = FetchingDog()
+    dog = CachingProxy(fetching_dog, {'fetch': 60, 'bark': None}, maxsize=2, clock=lambda: now[0])
+    assert dog.jump() == 'jump'
+    assert dog.fetch('ball') == dog.fetch('ball') == 'ball x1'
+    assert fetching_dog.fetched == ['ball']
+    assert dog.fetch('ball', times=2) == 'ball x2' and len(fetching_dog.fetched) == 2
+
+    # the least recently used result is evicted
+    dog.fetch('stick')
+    dog.fetch('ball')
+    assert len(fetching_dog.fetched) == 4 and dog.evictions == 2
+
+    # the results expire
+    now[0] = 100
+    dog.fetch('stick')
+    assert len(fetching_dog.fetched) == 5
+
+    dog.invalidate('fetch', 'stick')
+    dog.fetch('stick')
+    assert len(fetching_dog.fetched) == 6
+
+    # the concurrent identical calls call the subject once
+    dog.invalidate()
+    threads = [threading.Thread(target=dog.fetch, args=('frisbee',)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetching_dog.fetched.count('frisbee') == 1 and dog.deduplicated == 4
+
+    # a result computed before the invalidation is not cached
+    thread = threading.Thread(target=dog.fetch, args=('bone',))
+    thread.start()
+    time.sleep(0.01)
+    dog.invalidate('fetch')
+    thread.join()
+    assert dog.fetch('bone') and fetching_dog.fetched.count('bone') == 2
+    # the invalidation of another key does not affect a call in progress
+    thread = threading.Thread(target=dog.fetch, args=('rope',))
+    thread.start()
+    time.sleep(0.01)
+    dog.invalidate('fetch', 'bone')
+    thread.join()
+    dog.fetch('rope')
+    assert fetching_dog.fetched.count('rope') == 1
+
+    unbounded = CachingProxy(FetchingDog(), {'fetch': None}, maxsize=None)
+    assert [unbounded.fetch(i) for i in range(3)] == ['0 x1', '1 x1', '2 x1'] and unbounded.stats()['size'] == 3
+
+    # the waiting calls fail if the leading call is interrupted
+    class InterruptedDog(Dog):
+        def bark(self):
+            time.sleep(0.05)
+            raise KeyboardInterrupt
+
+    interrupted = CachingProxy(InterruptedDog(), {'bark': None})
+    errors = []
+
+    def bark():
+        try:
+            interrupted.bark()
+        except BaseException as error:
+            errors.append(type(error))
+
+    threads = [threading.Thread(target=bark) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(errors, key=lambda error: error.__name__) == [KeyboardInterrupt, RuntimeError, RuntimeError]
+    print(dog.stats())
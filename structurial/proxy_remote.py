@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+
+"""
+A remote proxy represents a subject which lives in another process: every method call becomes a request
+sent over a socket (here a Unix domain socket) and the result comes back in a response.
+
+Waiting for a response before sending the next request costs a full round-trip per call.
+So the proxies below support pipelining: many requests are sent before any response is read,
+and the responses are matched to the requests by the request ids.
+- RemoteProxy is a blocking client: a plain call waits for its result, a pipeline() sends a batch of calls at once
+- AsyncRemoteProxy is an asyncio client: all the concurrent calls are pipelined through one connection
+
+The messages are pickled, so the socket must be accessible only to the trusted processes.
+"""
+import asyncio
+import itertools
+import os
+import pickle
+import socket
+import struct
+import time
+
+from structurial.proxy import Dog
+
+# the length of a message
+FRAME = struct.Struct('<I')
+
+
+def _frame(message):
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return FRAME.pack(len(data)) + data
+
+
+def _response(request_id, ok, result):
+    """
+    Frames a response. A result (or an exception) which can not be pickled becomes an error of this request only.
+    """
+    try:
+        return _frame((request_id, ok, result))
+    except Exception as error:
+        return _frame((request_id, False, TypeError('Can not send the {} of the call back: {!r}'.format(
+            'result' if ok else 'error {!r}'.format(result), error))))
+
+
+class RemoteServer(object):
+    """
+    Serves the method calls of the subject: a request is (request id, method, args, kwargs),
+    a response is (request id, True, result) or (request id, False, exception).
+    """
+
+    def __init__(self, subject, path):
+        self.subject = subject
+        self.path = path
+
+    def _call(self, method, args, kwargs):
+        try:
+            if method.startswith('_'):
+                raise AttributeError(method)
+            return True, getattr(self.subject, method)(*args, **kwargs)
+        except Exception as error:
+            return False, error
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(FRAME.size)
+                request_id, method, args, kwargs = pickle.loads(await reader.readexactly(FRAME.unpack(header)[0]))
+                ok, result = self._call(method, args, kwargs)
+                writer.write(_response(request_id, ok, result))
+                # drain() waits only if the client does not read the responses fast enough
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        async with server:
+            await server.serve_forever()
+
+
+class _Pending(object):
+    """
+    A result of a pipelined call: it is available once the pipeline is executed.
+    """
+
+    def __init__(self):
+        self._done = False
+        self._ok = None
+        self._value = None
+
+    def _set(self, ok, value):
+        self._ok, self._value, self._done = ok, value, True
+
+    def result(self):
+        if not self._done:
+            raise RuntimeError('The pipeline has not been executed yet')
+        if not self._ok:
+            raise self._value
+        return self._value
+
+
+class Pipeline(object):
+    """
+    Collects the calls and sends them all at once on execute() (or at the end of the "with" block).
+    """
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._calls = []
+
+    def __getattr__(self, item):
+        def call(*args, **kwargs):
+            pending = _Pending()
+            self._calls.append((item, args, kwargs, pending))
+            return pending
+
+        return call
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        results = self._proxy._call_many([call[:3] for call in calls])
+        for (_, _, _, pending), (ok, value) in zip(calls, results):
+            pending._set(ok, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+
+class RemoteProxy(object):
+    """
+    A blocking client of the RemoteServer.
+    If a batch of calls fails after its first requests have been sent (ex. on KeyboardInterrupt), the replies
+    to them are still on the way and can not be told apart anymore: the proxy is broken and all the further calls
+    fail with ConnectionError.
+    """
+
+    def __init__(self, path):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self._file = self._socket.makefile('rb')
+        self._ids = itertools.count()
+        # why the proxy can not be used anymore, None while it is usable
+        self._broken = None
+
+    def _read(self):
+        data = self._file.read(FRAME.size)
+        if len(data) < FRAME.size:
+            raise ConnectionError('The server has closed the connection')
+        return pickle.loads(self._file.read(FRAME.unpack(data)[0]))
+
+    def _call_many(self, calls, window=256):
+        """
+        Sends the (method, args, kwargs) calls without waiting for the responses, returns (ok, result) pairs.
+        At most window calls are left unanswered after each sent chunk, so neither side blocks on a full socket buffer.
+        """
+        if self._broken is not None:
+            raise ConnectionError(self._broken)
+        # all the requests are pickled before anything is sent, so an unpicklable argument fails the batch cleanly
+        ids = [next(self._ids) for _ in calls]
+        frames = [_frame((request_id, method, args, kwargs)) for request_id, (method, args, kwargs) in zip(ids, calls)]
+        pending = {}
+        results = [None] * len(calls)
+        try:
+            for start in range(0, len(calls), window):
+                pending.update((ids[index], index) for index in range(start, min(start + window, len(calls))))
+                self._socket.sendall(b''.join(frames[start:start + window]))
+                while len(pending) > window:
+                    self._read_result(pending, results)
+            while pending:
+                self._read_result(pending, results)
+        except BaseException as error:
+            self._broken = 'A batch of calls has failed: {!r}'.format(error)
+            raise
+        return results
+
+    def _read_result(self, pending, results):
+        request_id, ok, value = self._read()
+        results[pending.pop(request_id)] = (ok, value)
+
+    def pipeline(self):
+        return Pipeline(self)
+
+    def __getattr__(self, item):
+        def call(*args, **kwargs):
+            (ok, value), = self._call_many([(item, args, kwargs)])
+            if not ok:
+                raise value
+            return value
+
+        return call
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+class AsyncRemoteProxy(object):
+    """
+    An asyncio client of the RemoteServer: use "await AsyncRemoteProxy.connect(path)" to create it.
+    Once the connection is lost all the pending and the new calls fail with ConnectionError.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._futures = {}
+        # why the connection can not be used anymore, None while it is open
+        self._closed = None
+        self._reading = asyncio.ensure_future(self._read_responses())
+
+    @classmethod
+    async def connect(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def _read_responses(self):
+        try:
+            while True:
+                header = await self._reader.readexactly(FRAME.size)
+                request_id, ok, value = pickle.loads(await self._reader.readexactly(FRAME.unpack(header)[0]))
+                future = self._futures.pop(request_id, None)
+                if future is None or future.done():
+                    # the call has been cancelled, ex. by a timeout: its reply is dropped
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        except asyncio.IncompleteReadError:
+            self._closed = 'The server has closed the connection'
+        except Exception as error:
+            self._closed = 'The connection has failed: {!r}'.format(error)
+        finally:
+            # also when the reading is cancelled by close()
+            self._closed = self._closed or 'The proxy has been closed'
+            futures, self._futures = self._futures, {}
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(self._closed))
+
+    def __getattr__(self, item):
+        async def call(*args, **kwargs):
+            if self._closed is not None:
+                raise ConnectionError(self._closed)
+            request_id = next(self._ids)
+            future = self._futures[request_id] = asyncio.get_running_loop().create_future()
+            try:
+                # no drain here: the requests of the concurrent calls are written out together
+                self._writer.write(_frame((request_id, item, args, kwargs)))
+                return await future
+            finally:
+                # the call may have failed or been cancelled before its reply has arrived
+                self._futures.pop(request_id, None)
+
+        return call
+
+    async def close(self):
+        self._closed = self._closed or 'The proxy has been closed'
+        self._reading.cancel()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+class ToyDog(Dog):
+    def slow(self):
+        time.sleep(0.1)
+        return 'slow'
+
+    def toy(self):
+        # a function can not be pickled, so it can not be sent to the client
+        return lambda: 'squeak'
+
+
+def serve_dog(path):
+    # runs in a separate process
+    asyncio.run(RemoteServer(ToyDog(), path).serve_forever())
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'dog.sock')
+        server = multiprocessing.Process(target=serve_dog, args=(path,), daemon=True)
+        server.start()
+        while not os.path.exists(path):
+            time.sleep(0.01)
+
+        dog = RemoteProxy(path)
+        assert dog.jump() == 'jump'
+        try:
+            dog.fly()
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError('Dogs do not fly')
+        # an unpicklable result fails only its own call, the connection is still usable
+        try:
+            dog.toy()
+        except TypeError:
+            pass
+        else:
+            raise AssertionError('A function can not be sent')
+        assert dog.bark() == 'bark'
+        # an unpicklable argument fails the pipeline before anything is sent
+        try:
+            with dog.pipeline() as pipeline:
+                for _ in range(300):
+                    pipeline.bark()
+                pipeline.jump(lambda: 'up')
+        except (pickle.PicklingError, AttributeError, TypeError):
+            pass
+        else:
+            raise AssertionError('A function can not be sent')
+        assert dog.bark() == 'bark'
+        with dog.pipeline() as pipeline:
+            jump = pipeline.jump()
+            bark = pipeline.bark()
+        assert jump.result() == 'jump' and bark.result() == 'bark'
+
+        count = 10000
+        started = time.perf_counter()
+        for _ in range(count):
+            dog.bark()
+        sequential = count / (time.perf_counter() - started)
+        started = time.perf_counter()
+        with dog.pipeline() as pipeline:
+            for _ in range(count):
+                pipeline.bark()
+        pipelined = count / (time.perf_counter() - started)
+        dog.close()
+
+        async def call_async():
+            dog = await AsyncRemoteProxy.connect(path)
+            assert await dog.jump() == 'jump'
+            # a reply to a cancelled call is dropped, the connection stays usable
+            try:
+                await asyncio.wait_for(dog.slow(), 0.05)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                raise AssertionError('The call has not timed out')
+            assert await dog.bark() == 'bark'
+            started = time.perf_counter()
+            results = await asyncio.gather(*[dog.bark() for _ in range(count)])
+            elapsed = time.perf_counter() - started
+            assert results == ['bark'] * count
+            await dog.close()
+            try:
+                await dog.bark()
+            except ConnectionError:
+                pass
+            else:
+                raise AssertionError('The proxy is closed')
+            return count / elapsed
+
+        concurrent = asyncio.run(call_async())
+        server.terminate()
+        server.join()
+    print('calls per second: sequential {:.0f}, pipelined {:.0f}, asyncio {:.0f}'.format(
+        sequential, pipelined, concurrent))
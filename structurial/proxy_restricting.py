@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+DogProxy in the Proxy example checks every attribute access against the restrict list (O(n) for a list)
+and then looks the attribute up in the dog again and again.
+
+The AccessRules below are compiled once into a frozenset of names, a tuple of prefixes and a single regular
+expression, so checking a name is O(1) for the exact names.
+RestrictingProxy stores every allowed method in its own __dict__ after the first access: the following accesses
+find it there and __getattr__ is not called at all.
+"""
+import re
+import timeit
+
+from structurial.proxy import Dog, DogProxy
+
+
+class AccessRules(object):
+    """
+    Compiled access rules: a name is denied if it is in deny, starts with one of deny_prefixes
+    or matches one of deny_patterns. If allow is given, the names which are not in it are denied too.
+    """
+
+    def __init__(self, deny=(), deny_prefixes=(), deny_patterns=(), allow=None):
+        self.deny = frozenset(deny)
+        self.deny_prefixes = tuple(deny_prefixes)
+        self.deny_pattern = re.compile('|'.join('(?:{})'.format(p) for p in deny_patterns)) if deny_patterns else None
+        self.allow = None if allow is None else frozenset(allow)
+
+    def is_allowed(self, name):
+        if name in self.deny:
+            return False
+        if self.allow is not None and name not in self.allow:
+            return False
+        if self.deny_prefixes and name.startswith(self.deny_prefixes):
+            return False
+        if self.deny_pattern is not None and self.deny_pattern.match(name):
+            return False
+        return True
+
+
+class RestrictingProxy(object):
+    """
+    Proxies the attribute accesses to the subject and denies the ones restricted by the rules.
+    The rules may be shared by any number of proxies.
+    """
+
+    def __init__(self, subject, rules):
+        self._subject = subject
+        self._rules = rules
+
+    def __getattr__(self, item):
+        if not self._rules.is_allowed(item):
+            raise AttributeError(item)
+        value = getattr(self._subject, item)
+        if callable(value):
+            # a bound method does not change: cache it so the next access does not get here
+            self.__dict__[item] = value
+        return value
+
+
+if __name__ == '__main__':
+    dog = RestrictingProxy(Dog(), AccessRules(deny=['bark']))
+    assert dog.jump() == 'jump'
+    assert 'jump' in vars(dog)
+    try:
+        dog.bark()
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError('bark is restricted')
+
+    rules = AccessRules(deny_prefixes=['b'], deny_patterns=[r'.*_internal$'])
+    assert not rules.is_allowed('bark') and not rules.is_allowed('eat_internal') and rules.is_allowed('jump')
+    assert not AccessRules(allow=['jump']).is_allowed('bark')
+
+    restrict = ['method{}'.format(i) for i in range(1000)] + ['bark']
+    dog_proxy = DogProxy(restrict)
+    restricting_proxy = RestrictingProxy(Dog(), AccessRules(deny=restrict))
+    print('100000 jump() calls with 1001 restricted names: DogProxy {:.4f}s, RestrictingProxy {:.4f}s'.format(
+        timeit.timeit(lambda: dog_proxy.jump(), number=100000),
+        timeit.timeit(lambda: restricting_proxy.jump(), number=100000)))
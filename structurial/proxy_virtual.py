@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+DogProxy in the Proxy example creates the dog right in its __init__, even if the proxy is never used.
+A virtual proxy keeps only the way to create the real subject and creates it on the first attribute access.
+The creation is thread-safe: concurrent first accesses create the subject only once.
+
+The subject may also be released after it has not been used for idle_timeout seconds: the proxy creates it
+again on the next access. The release is done by release_if_idle(), ex. from an IdleReaper thread.
+"""
+from functools import partial
+import threading
+import time
+import tracemalloc
+import weakref
+
+from structurial.proxy import Dog
+
+
+class VirtualProxy(object):
+    """
+    Creates the subject by calling the factory on the first attribute access.
+    """
+
+    def __init__(self, factory, idle_timeout=None, clock=time.monotonic):
+        self._factory = factory
+        self._idle_timeout = idle_timeout
+        self._clock = clock
+        self._subject = None
+        self._last_used = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self):
+        return self._subject is not None
+
+    def _get_subject(self):
+        subject = self._subject
+        if subject is None:
+            with self._lock:
+                subject = self._subject
+                if subject is None:
+                    subject = self._factory()
+                    # set before the subject is published, so release_if_idle() never sees it without _last_used
+                    self._last_used = self._clock()
+                    self._subject = subject
+                    return subject
+        if self._idle_timeout is not None:
+            self._last_used = self._clock()
+        return subject
+
+    def __getattr__(self, item):
+        return getattr(self._get_subject(), item)
+
+    def release_if_idle(self):
+        """
+        Releases the subject if it has not been used for idle_timeout seconds, returns True if released.
+        """
+        if self._idle_timeout is None or self._subject is None:
+            return False
+        with self._lock:
+            last_used = self._last_used
+            if self._subject is not None and last_used is not None and self._clock() - last_used >= self._idle_timeout:
+                self._subject = None
+                return True
+        return False
+
+
+class IdleReaper(threading.Thread):
+    """
+    A background thread which releases the idle subjects of the proxies every interval seconds.
+    The proxies are held weakly, so a proxy is not kept alive only by the reaper.
+    """
+
+    def __init__(self, interval):
+        super(IdleReaper, self).__init__()
+        self.daemon = True
+        self.interval = interval
+        self.proxies = weakref.WeakSet()
+        self._stop_event = threading.Event()
+
+    def add(self, proxy):
+        self.proxies.add(proxy)
+        return proxy
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            for proxy in list(self.proxies):
+                proxy.release_if_idle()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class HeavyDog(Dog):
+    """
+    A dog which takes a lot of memory and time to create.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.memories = bytearray(10000)
+        time.sleep(0.0001)
+
+
+def _cost(create, count=1000):
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        objects = [create(i) for i in range(count)]
+        return time.perf_counter() - started, tracemalloc.get_traced_memory()[0] // len(objects)
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    created = []
+
+    def create_dog():
+        created.append(Dog())
+        return created[-1]
+
+    now = [0]
+    dog = VirtualProxy(create_dog, idle_timeout=60, clock=lambda: now[0])
+    assert not dog.created
+    threads = [threading.Thread(target=dog.jump) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1 and dog.bark() == 'bark'
+
+    now[0] = 30
+    assert not dog.release_if_idle()
+    now[0] = 90
+    assert dog.release_if_idle() and not dog.created
+    assert dog.jump() == 'jump' and len(created) == 2
+
+    reaper = IdleReaper(0.01)
+    real_clock_dog = reaper.add(VirtualProxy(Dog, idle_timeout=0.01))
+    reaper.start()
+    real_clock_dog.jump()
+    time.sleep(0.1)
+    reaper.stop()
+    assert not real_clock_dog.created
+
+    eager = _cost(lambda i: HeavyDog(i))
+    lazy = _cost(lambda i: VirtualProxy(partial(HeavyDog, i)))
+    print('1000 untouched dogs: eager {:.4f}s, {} bytes each; virtual proxy {:.4f}s, {} bytes each'.format(
+        eager[0], eager[1], lazy[0], lazy[1]))